@@ -62,6 +62,13 @@ class App extends Component {
 
     let csrfToken = document.querySelector("[name=csrfmiddlewaretoken]").value;
 
+    // Повторная отправка того же заказа идёт с тем же ключом, и сервер не создаст дубль.
+    let body = JSON.stringify(data);
+    if (this.checkoutBody !== body){
+      this.checkoutBody = body;
+      this.checkoutIdempotencyKey = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    }
+
     try {
       let response = await fetch(url, {
         method: 'post',
@@ -69,8 +76,9 @@ class App extends Component {
           'Accept': 'application/json',
           'Content-Type': 'application/json',
           'X-CSRFToken': csrfToken,
+          'Idempotency-Key': this.checkoutIdempotencyKey,
         },
-        body: JSON.stringify(data),
+        body: body,
       });
 
       if (!response.ok){
@@ -79,6 +87,7 @@ class App extends Component {
       }
       let responseData = await response.json();
 
+      this.checkoutBody = null;
       this.setState({
         cart: [],
       });
@@ -1,12 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.shortcuts import redirect
 from django.templatetags.static import static
 from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
-from .models import (Order, OrderElement, Product, ProductCategory, Restaurant,
-                     RestaurantMenuItem)
+from .assignment import assign_restaurants
+from .models import (ArchivedOrder, ArchivedOrderElement, Banner, Order,
+                     OrderElement, OrderIntake, Product, ProductCategory,
+                     Restaurant, RestaurantMenuItem)
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -19,6 +21,18 @@ class OrderElementInline(admin.TabularInline):
     extra = 0
 
 
+class ArchivedOrderElementInline(admin.TabularInline):
+    model = ArchivedOrderElement
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
     search_fields = [
@@ -30,6 +44,12 @@ class RestaurantAdmin(admin.ModelAdmin):
         'name',
         'address',
         'contact_phone',
+        'open_orders_count',
+    ]
+    readonly_fields = [
+        'latitude',
+        'longitude',
+        'open_orders_count',
     ]
     inlines = [
         RestaurantMenuItemInline
@@ -111,19 +131,71 @@ class ProductCategoryAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'get_image_list_preview',
+        'title',
+        'text',
+        'order',
+        'is_active',
+    ]
+    list_display_links = [
+        'title',
+    ]
+    list_editable = [
+        'order',
+        'is_active',
+    ]
+    readonly_fields = [
+        'get_image_preview',
+    ]
+
+    def get_image_preview(self, obj):
+        if not obj.image:
+            return 'выберите картинку'
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+    get_image_preview.short_description = 'превью'
+
+    def get_image_list_preview(self, obj):
+        if not obj.image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" style="max-height: 50px;"/>', src=obj.image.url)
+    get_image_list_preview.short_description = 'превью'
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'total_cost')
     list_display = [
         'status',
         'address',
         'firstname',
         'lastname',
         'phonenumber',
+        'total_cost',
     ]
     inlines = [
         OrderElementInline
     ]
+    actions = ['assign_nearest_restaurants']
+
+    @admin.action(description='Назначить ближайшие рестораны')
+    def assign_nearest_restaurants(self, request, queryset):
+        assignment = assign_restaurants(queryset)
+
+        self.message_user(
+            request,
+            f'Назначено заказов: {len(assignment.restaurant_ids)}, '
+            f'суммарное расстояние {assignment.total_distance} км.'
+        )
+        if assignment.unassigned_ids:
+            self.message_user(
+                request,
+                'Не нашлось ресторана с нужными товарами, координатами '
+                f'и свободным местом для {len(assignment.unassigned_ids)} заказов.',
+                level=messages.WARNING
+            )
 
     def save_formset(self, request, form, formset, change):
         order = form.save(commit=False)
@@ -142,6 +214,17 @@ class OrderAdmin(admin.ModelAdmin):
                 instance.price = instance.product.price
             instance.save()
 
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        # Ссылки на заказ, уже перенесённый в архив, ведут в архив.
+        if object_id.isdigit() and \
+                not Order.objects.filter(pk=object_id).exists() and \
+                ArchivedOrder.objects.filter(pk=object_id).exists():
+            return redirect(
+                'admin:foodcartapp_archivedorder_change',
+                object_id
+            )
+        return super().change_view(request, object_id, form_url, extra_context)
+
     def response_post_save_change(self, request, obj):
         res = super().response_post_save_change(request, obj)
         if 'next' in request.GET:
@@ -151,3 +234,47 @@ class OrderAdmin(admin.ModelAdmin):
                 return redirect(redirect_url)
 
         return res
+
+
+@admin.register(OrderIntake)
+class OrderIntakeAdmin(admin.ModelAdmin):
+    readonly_fields = ('tracking_id', 'created_at', 'processed_at')
+    list_display = [
+        'tracking_id',
+        'status',
+        'order_id',
+        'created_at',
+        'processed_at',
+    ]
+    list_filter = ['status']
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'address',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'total_cost',
+        'created_at',
+        'archived_at',
+    ]
+    list_filter = ['serving_restaurant']
+    search_fields = [
+        '=id',
+        'address',
+        'lastname',
+        'phonenumber',
+    ]
+    date_hierarchy = 'created_at'
+    inlines = [
+        ArchivedOrderElementInline
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,92 @@
+"""Перенос завершённых заказов в архивные таблицы.
+
+Менеджеру завершённые заказы не нужны, но без переноса они навсегда
+остаются в таблице заказов и раздувают её индексы. Заказы переносятся
+порциями, каждая в своей транзакции, поэтому прерванный перенос
+достаточно запустить ещё раз: он продолжит с того места, где остановился.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderElement, Order, OrderElement
+
+ORDER_FIELDS = [field.attname for field in Order._meta.concrete_fields]
+ELEMENT_FIELDS = [field.attname for field in OrderElement._meta.concrete_fields]
+
+
+def get_archivable_orders(days=None):
+    """Возвращает завершённые заказы, оформленные раньше чем days дней назад."""
+    if days is None:
+        days = settings.ORDER_ARCHIVE_DAYS
+
+    return Order.objects.filter(
+        status=Order.COMPLETED,
+        created_at__lt=timezone.now() - timedelta(days=days)
+    )
+
+
+def delete_rows(model, column, values):
+    """Удаляет строки модели, у которых column входит в values, без сигналов."""
+    quote_name = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(model._meta.db_table)} '
+            f'WHERE {quote_name(column)} IN ({placeholders})',
+            values
+        )
+
+
+def archive_chunk(orders, chunk_size):
+    """Переносит в архив очередную порцию заказов и возвращает их число."""
+    with transaction.atomic():
+        order_ids = list(
+            orders
+            .select_for_update()
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not order_ids:
+            return 0
+
+        archived_at = timezone.now()
+        # Если заказ с таким id уже лежит в архиве, вставка упадёт
+        # с IntegrityError и откатит всю порцию: удалять заказ, копия
+        # которого не записалась, нельзя.
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(**order, archived_at=archived_at)
+            for order in (
+                Order.objects
+                .filter(pk__in=order_ids)
+                .values(*ORDER_FIELDS)
+            )
+        ])
+        ArchivedOrderElement.objects.bulk_create([
+            ArchivedOrderElement(**element)
+            for element in (
+                OrderElement.objects
+                .filter(order_id__in=order_ids)
+                .values(*ELEMENT_FIELDS)
+            )
+        ])
+
+        # Обычный delete загрузил бы каждую строку ради сигналов:
+        # пересчёта стоимости и счётчиков заказов в сборке. Завершённым
+        # заказам они не нужны, поэтому строки удаляются одним запросом.
+        delete_rows(OrderElement, 'order_id', order_ids)
+        delete_rows(Order, 'id', order_ids)
+
+    return len(order_ids)
+
+
+def archive_orders(days=None, chunk_size=1000):
+    """Переносит в архив завершённые заказы порциями по chunk_size.
+
+    Выдаёт число заказов, перенесённых каждой порцией.
+    """
+    orders = get_archivable_orders(days)
+    while archived_count := archive_chunk(orders, chunk_size):
+        yield archived_count
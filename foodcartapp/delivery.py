@@ -0,0 +1,68 @@
+"""Объединение доставляемых заказов одного ресторана в поездки курьеров."""
+from collections import namedtuple
+from itertools import groupby
+
+from django.conf import settings
+from geolocation.models import Location
+from geolocation.routing import plan_routes
+
+from .models import Order
+
+DeliveryBatch = namedtuple('DeliveryBatch', 'orders distance')
+RestaurantRoutes = namedtuple('RestaurantRoutes', 'restaurant batches unrouted_orders')
+
+
+def get_delivery_routes(batch_size=None):
+    """Раскладывает доставляемые заказы по поездкам курьеров.
+
+    Заказы одного ресторана делятся на поездки не больше batch_size
+    адресов, внутри поездки адреса идут в порядке объезда. Заказы без
+    координат адреса, как и все заказы ресторана без координат,
+    попадают в unrouted_orders.
+    """
+    if batch_size is None:
+        batch_size = settings.COURIER_BATCH_SIZE
+
+    orders = list(
+        Order.objects
+        .filter(status=Order.DELIVERED, serving_restaurant__isnull=False)
+        .select_related('serving_restaurant')
+        .order_by('serving_restaurant_id', 'created_at', 'id')
+    )
+    coordinates = Location.get_coordinates_bulk(
+        [order.address for order in orders],
+        geocode_missing=False
+    )
+
+    restaurant_routes = []
+    for _, restaurant_orders in groupby(orders, key=lambda order: order.serving_restaurant_id):
+        restaurant_orders = list(restaurant_orders)
+        restaurant = restaurant_orders[0].serving_restaurant
+        depot = restaurant.get_lonlat()
+
+        routed_orders = [
+            order for order in restaurant_orders
+            if depot and coordinates.get(order.address)
+        ]
+        routed_ids = {order.id for order in routed_orders}
+        routes = plan_routes(
+            depot,
+            [coordinates[order.address] for order in routed_orders],
+            batch_size
+        )
+
+        restaurant_routes.append(RestaurantRoutes(
+            restaurant=restaurant,
+            batches=[
+                DeliveryBatch(
+                    orders=[routed_orders[stop] for stop in route.stops],
+                    distance=route.distance,
+                )
+                for route in routes
+            ],
+            unrouted_orders=[
+                order for order in restaurant_orders if order.id not in routed_ids
+            ],
+        ))
+
+    return restaurant_routes
@@ -0,0 +1,184 @@
+"""Потоковая выгрузка заказов с элементами в CSV и NDJSON.
+
+Заказы и элементы читаются двумя курсорами, отсортированными по id
+заказа, и сливаются на лету, поэтому память не зависит от числа
+заказов: в ней держится только очередная порция строк. Архивные
+заказы по желанию выгружаются следом за заказами из основной таблицы.
+"""
+import csv
+import json
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderElement, Order, OrderElement
+
+ORDER_FIELDS = (
+    'id',
+    'created_at',
+    'status',
+    'method_payment',
+    'firstname',
+    'lastname',
+    'phonenumber',
+    'address',
+    'serving_restaurant_id',
+    'total_cost',
+)
+ELEMENT_FIELDS = (
+    'product_id',
+    'product__name',
+    'quantity',
+    'price',
+)
+
+CSV_HEADER = (
+    *ORDER_FIELDS,
+    'product_id',
+    'product_name',
+    'quantity',
+    'price',
+)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def merge_orders_with_elements(orders, elements, chunk_size):
+    """Выдаёт пары (строка заказа, список строк его элементов).
+
+    Строки — кортежи значений полей ORDER_FIELDS и ELEMENT_FIELDS.
+    """
+    order_rows = (
+        orders
+        .order_by('id')
+        .values_list(*ORDER_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    element_rows = (
+        elements
+        .filter(order__in=orders.values('id'))
+        .order_by('order_id', 'id')
+        .values_list('order_id', *ELEMENT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    element_row = next(element_rows, None)
+    for order_row in order_rows:
+        order_id = order_row[0]
+
+        # Элементы заказов, появившихся после начала выгрузки, пропускаются.
+        while element_row is not None and element_row[0] < order_id:
+            element_row = next(element_rows, None)
+
+        elements = []
+        while element_row is not None and element_row[0] == order_id:
+            elements.append(element_row[1:])
+            element_row = next(element_rows, None)
+
+        yield order_row, elements
+
+
+def iter_orders_with_elements(orders=None, chunk_size=2000, include_archive=False):
+    """Выдаёт заказы с элементами, а с include_archive — и архивные заказы."""
+    if orders is None:
+        orders = Order.objects.all()
+
+    started_at = timezone.now()
+    yield from merge_orders_with_elements(
+        orders,
+        OrderElement.objects.all(),
+        chunk_size
+    )
+
+    if include_archive:
+        # Заказы, перенесённые в архив во время выгрузки, уже попали
+        # в неё из основной таблицы.
+        yield from merge_orders_with_elements(
+            ArchivedOrder.objects.filter(archived_at__lt=started_at),
+            ArchivedOrderElement.objects.all(),
+            chunk_size
+        )
+
+
+def dump_order_row(order_row):
+    """Превращает строку заказа в словарь с сериализуемыми значениями."""
+    order = dict(zip(ORDER_FIELDS, order_row))
+    order['created_at'] = order['created_at'].isoformat()
+    order['phonenumber'] = str(order['phonenumber'])
+    return order
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(orders_with_elements):
+    """Выдаёт CSV построчно: по строке на элемент заказа."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+
+    for order_row, elements in orders_with_elements:
+        order_values = dump_order_row(order_row).values()
+        if not elements:
+            yield writer.writerow(order_values)
+        for element in elements:
+            yield writer.writerow((*order_values, *element))
+
+
+def export_ndjson(orders_with_elements):
+    """Выдаёт NDJSON: по строке на заказ с вложенным списком элементов."""
+    for order_row, elements in orders_with_elements:
+        order = dump_order_row(order_row)
+        order['elements'] = [
+            {
+                'product_id': product_id,
+                'product_name': product_name,
+                'quantity': quantity,
+                'price': price,
+            }
+            for product_id, product_name, quantity, price in elements
+        ]
+        yield json.dumps(order, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_orders(export_format, orders=None, chunk_size=2000, include_archive=False):
+    """Выдаёт выгрузку заказов в формате csv или ndjson по частям.
+
+    Строки склеиваются по chunk_size, чтобы не отдавать их клиенту
+    по одной.
+    """
+    orders_with_elements = iter_orders_with_elements(
+        orders,
+        chunk_size,
+        include_archive
+    )
+    if export_format == 'csv':
+        lines = export_csv(orders_with_elements)
+    else:
+        lines = export_ndjson(orders_with_elements)
+
+    while chunk := ''.join(islice(lines, chunk_size)):
+        yield chunk
+
+
+def spool_orders_export(export_format, include_archive=False, max_size=8 * 1024 * 1024):
+    """Записывает выгрузку во временный файл и возвращает его открытым.
+
+    Под ASGI Django 3.2 читает потоковый ответ прямо в цикле событий,
+    где запросы к базе запрещены, поэтому выгрузка готовится заранее,
+    в потоке представления. Файл держится в памяти, пока не превысит
+    max_size байт, а затем уходит на диск.
+    """
+    file = SpooledTemporaryFile(max_size=max_size)
+    for chunk in export_orders(export_format, include_archive=include_archive):
+        file.write(chunk.encode())
+    file.seek(0)
+    return file
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from foodcartapp.archive import archive_orders, get_archivable_orders
+
+
+class Command(BaseCommand):
+    help = 'Переносит завершённые заказы в архив порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ORDER_ARCHIVE_DAYS,
+            help='Переносить заказы, оформленные больше стольких дней назад.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько заказов переносить в одной транзакции.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать заказы, которые попадут в архив.'
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            archivable_count = get_archivable_orders(options['days']).count()
+            self.stdout.write(f'Заказов для переноса в архив: {archivable_count}')
+            return
+
+        total = 0
+        try:
+            for archived_count in archive_orders(options['days'], options['chunk_size']):
+                total += archived_count
+                self.stdout.write(f'Перенесено в архив заказов: {total}')
+        except IntegrityError as error:
+            raise CommandError(
+                'Часть заказов очередной порции уже лежит в архиве, '
+                f'порция не перенесена: {error}'
+            )
+
+        if not total:
+            self.stdout.write('Нет заказов для переноса в архив.')
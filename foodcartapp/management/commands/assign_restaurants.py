@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.assignment import assign_restaurants
+
+
+class Command(BaseCommand):
+    help = 'Назначает ближайшие рестораны необработанным заказам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            help=(
+                'Сколько собираемых заказов может быть у ресторана. '
+                'По умолчанию настройка RESTAURANT_OPEN_ORDERS_LIMIT.'
+            )
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать назначение, ничего не меняя.'
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        assignment = assign_restaurants(
+            capacity=options['capacity'],
+            dry_run=options['dry_run']
+        )
+        elapsed = time.perf_counter() - started_at
+
+        self.stdout.write(
+            f'Назначено заказов: {len(assignment.restaurant_ids)}, '
+            f'без ресторана: {len(assignment.unassigned_ids)}, '
+            f'суммарное расстояние: {assignment.total_distance} км, '
+            f'за {elapsed:.2f} с'
+        )
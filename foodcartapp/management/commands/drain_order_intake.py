@@ -0,0 +1,99 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from foodcartapp.models import Order, OrderIntake, Product
+
+
+class Command(BaseCommand):
+    help = 'Записывает заказы из очереди приёма в таблицы заказов пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько заказов записывать за один проход.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь один раз и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            handled = self.process_batch(options['batch_size'])
+
+            if handled:
+                self.stdout.write(f'Разобрано заказов из очереди: {handled}')
+                continue
+
+            if options['once']:
+                return
+
+            time.sleep(options['interval'])
+
+    def process_batch(self, batch_size):
+        with transaction.atomic():
+            intakes = list(
+                OrderIntake.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=OrderIntake.QUEUED)
+                .order_by('id')[:batch_size]
+            )
+            if not intakes:
+                return 0
+
+            # Цены проверялись по кэшу, а товар могли успеть удалить.
+            product_ids = {
+                element['product']
+                for intake in intakes
+                for element in intake.payload['products']
+            }
+            existing_product_ids = set(
+                Product.objects
+                .filter(pk__in=product_ids)
+                .values_list('pk', flat=True)
+            )
+
+            accepted_intakes = []
+            orders_elements = []
+            for intake in intakes:
+                missing_product_ids = {
+                    element['product'] for element in intake.payload['products']
+                } - existing_product_ids
+
+                if missing_product_ids:
+                    intake.status = OrderIntake.FAILED
+                    intake.error = 'Товары больше не продаются: ' + ', '.join(
+                        map(str, sorted(missing_product_ids))
+                    )
+                    continue
+
+                accepted_intakes.append(intake)
+                orders_elements.append(intake.build_order())
+
+            orders = Order.objects.create_with_elements(orders_elements)
+
+            processed_at = timezone.now()
+            for intake, order in zip(accepted_intakes, orders):
+                intake.status = OrderIntake.PROCESSED
+                intake.order_id = order.id
+            for intake in intakes:
+                intake.processed_at = processed_at
+
+            OrderIntake.objects.bulk_update(
+                intakes,
+                ['status', 'order_id', 'error', 'processed_at']
+            )
+
+        return len(intakes)
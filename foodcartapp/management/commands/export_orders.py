@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.export import EXPORT_FORMATS, export_orders
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заказы с элементами в CSV или NDJSON, не загружая их в память.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='csv',
+            help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для выгрузки. По умолчанию выгрузка пишется в stdout.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз.'
+        )
+        parser.add_argument(
+            '--include-archive',
+            action='store_true',
+            help='Выгрузить и заказы из архива.'
+        )
+
+    def handle(self, *args, **options):
+        chunks = export_orders(
+            options['format'],
+            chunk_size=options['chunk_size'],
+            include_archive=options['include_archive']
+        )
+
+        if not options['output']:
+            sys.stdout.writelines(chunks)
+            return
+
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            output.writelines(chunks)
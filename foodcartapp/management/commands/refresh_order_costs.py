@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Coalesce
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сохранённую стоимость заказов по их элементам '
+        'или сверяет её с суммой элементов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сверить стоимость, ничего не меняя.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько заказов пересчитывать в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify()
+        else:
+            self.backfill(options['chunk_size'])
+
+    def backfill(self, chunk_size):
+        last_id = 0
+        refreshed = 0
+
+        while True:
+            order_ids = list(
+                Order.objects
+                .filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not order_ids:
+                break
+
+            with transaction.atomic():
+                refreshed += (
+                    Order.objects
+                    .filter(pk__in=order_ids)
+                    .refresh_total_cost()
+                )
+            last_id = order_ids[-1]
+
+        self.stdout.write(f'Пересчитано заказов: {refreshed}')
+
+    def verify(self):
+        mismatched = (
+            Order.objects
+            .get_cost()
+            .annotate(
+                elements_cost=Coalesce(
+                    F('cost'),
+                    Value(0),
+                    output_field=DecimalField()
+                )
+            )
+            .exclude(total_cost=F('elements_cost'))
+            .values_list('pk', 'total_cost', 'elements_cost')
+        )
+
+        count = 0
+        for order_id, total_cost, elements_cost in mismatched.iterator():
+            count += 1
+            self.stdout.write(
+                f'Заказ {order_id}: сохранено {total_cost}, по элементам {elements_cost}'
+            )
+
+        if count:
+            raise CommandError(f'Расходится стоимость заказов: {count}')
+
+        self.stdout.write('Стоимость всех заказов совпадает с суммой элементов.')
@@ -0,0 +1,252 @@
+import json
+import random
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from io import StringIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from django.utils import timezone
+from geolocation import geocode_api
+
+from foodcartapp.models import Product
+
+DB_TIMING_PATTERN = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def parse_size(size):
+    try:
+        restaurants, products, orders = map(int, size.split('x'))
+    except ValueError:
+        raise CommandError(
+            f'Размер «{size}» должен выглядеть как РЕСТОРАНЫxТОВАРЫxЗАКАЗЫ'
+        )
+    return {'restaurants': restaurants, 'products': products, 'orders': orders}
+
+
+def summarize(latencies, queries, elapsed):
+    """Сводит замеры одного сценария: перцентили в мс и пропускная способность."""
+    cut_points = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'p50_ms': round(cut_points[49] * 1000, 2),
+        'p90_ms': round(cut_points[89] * 1000, 2),
+        'p95_ms': round(cut_points[94] * 1000, 2),
+        'p99_ms': round(cut_points[98] * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'queries_median': statistics.median(queries) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку и пропускную способность каталога, оформления '
+        'заказа и страницы менеджера на нескольких объёмах данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10x50x100,50x200x1000',
+            help='Объёмы данных через запятую: РЕСТОРАНЫxТОВАРЫxЗАКАЗЫ.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько замеряемых запросов делать в каждом сценарии.'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Сколько запросов сделать до начала замеров.'
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark.json',
+            help='Куда записать результаты в формате JSON.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Результаты прошлого прогона, с которыми сравнить p95.'
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=0.25,
+            help='Допустимый относительный рост p95 по сравнению с --baseline.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('Для перцентилей нужно хотя бы два запроса.')
+        sizes = [parse_size(size) for size in options['sizes'].split(',')]
+
+        media_root = tempfile.mkdtemp(prefix='star-burger-benchmark-')
+        setup_test_environment()
+        try:
+            # Замеры идут на отдельном кэше в памяти процесса: общий кэш
+            # из CACHE_URL обслуживает рабочий сайт, и run_size его бы очистил.
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                GEOCODER_BACKEND='geolocation.geocode_api.StubGeocoder',
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'star-burger-benchmark',
+                }},
+            ):
+                geocode_api._geocoder = None
+                old_config = setup_databases(verbosity=0, interactive=False)
+                try:
+                    results = [
+                        result
+                        for size in sizes
+                        for result in self.run_size(size, options)
+                    ]
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+                    geocode_api._geocoder = None
+        finally:
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'requests_per_scenario': options['requests'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['max_regression'])
+
+    def run_size(self, size, options):
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        call_command(
+            'seed_benchmark_data',
+            seed=options['seed'],
+            stdout=self.stdout if options['verbosity'] > 1 else StringIO(),
+            **size
+        )
+
+        manager = get_user_model().objects.create_user(
+            'benchmark', password=None, is_staff=True
+        )
+        manager_client = Client()
+        manager_client.force_login(manager)
+        client = Client()
+
+        rng = random.Random(options['seed'])
+        product_ids = list(Product.objects.values_list('pk', flat=True))
+
+        def register_order():
+            address_number = rng.randrange(max(size['orders'], 1))
+            return client.post(
+                '/api/order/',
+                data={
+                    'products': [
+                        {'product': product_id, 'quantity': rng.randint(1, 5)}
+                        for product_id in rng.sample(
+                            product_ids, min(3, len(product_ids))
+                        )
+                    ],
+                    'firstname': 'Замер',
+                    'lastname': 'Нагрузочный',
+                    'phonenumber': '+79001234567',
+                    'address': f'Москва, Заказной проезд, дом {address_number}',
+                },
+                content_type='application/json',
+            )
+
+        scenarios = {
+            'product_list_api': lambda: client.get(
+                '/api/products/', HTTP_ACCEPT_ENCODING='gzip, br'
+            ),
+            'register_order': register_order,
+            'view_orders': lambda: manager_client.get('/manager/orders/'),
+        }
+
+        results = []
+        for name, send_request in scenarios.items():
+            summary = self.measure(name, send_request, options)
+            results.append({'size': size, 'scenario': name, **summary})
+            self.stdout.write(
+                f'{size["restaurants"]}x{size["products"]}x{size["orders"]} '
+                f'{name}: p50 {summary["p50_ms"]} мс, '
+                f'p95 {summary["p95_ms"]} мс, '
+                f'p99 {summary["p99_ms"]} мс, '
+                f'{summary["throughput_rps"]} запросов/с, '
+                f'SQL-запросов {summary["queries_median"]}'
+            )
+        return results
+
+    @staticmethod
+    def measure(name, send_request, options):
+        for _ in range(options['warmup']):
+            send_request()
+
+        latencies = []
+        queries = []
+        started_at = time.perf_counter()
+        for _ in range(options['requests']):
+            request_started_at = time.perf_counter()
+            response = send_request()
+            latencies.append(time.perf_counter() - request_started_at)
+
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'Сценарий {name} получил ответ {response.status_code}'
+                )
+            match = DB_TIMING_PATTERN.search(response.get('Server-Timing', ''))
+            if match:
+                queries.append(int(match.group(1)))
+        elapsed = time.perf_counter() - started_at
+
+        return summarize(latencies, queries, elapsed)
+
+    def compare(self, results, baseline_path, max_regression):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        baseline_p95 = {
+            (json.dumps(result['size'], sort_keys=True), result['scenario']): result['p95_ms']
+            for result in baseline['results']
+        }
+        regressions = []
+        for result in results:
+            key = (json.dumps(result['size'], sort_keys=True), result['scenario'])
+            if key not in baseline_p95:
+                continue
+            allowed = baseline_p95[key] * (1 + max_regression)
+            if result['p95_ms'] > allowed:
+                regressions.append(
+                    f'{result["scenario"]} {result["size"]}: '
+                    f'p95 {result["p95_ms"]} мс, было {baseline_p95[key]} мс'
+                )
+
+        if regressions:
+            raise CommandError(
+                'p95 вырос больше допустимого:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write('p95 в пределах допустимого по сравнению с прошлым прогоном')
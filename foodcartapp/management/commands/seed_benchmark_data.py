@@ -0,0 +1,196 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from geolocation.geocode_api import StubGeocoder
+from geolocation.models import Location
+
+from foodcartapp.models import (Order, OrderElement, Product, ProductCategory,
+                                Restaurant, RestaurantMenuItem)
+from foodcartapp.payloads import products_payload
+from foodcartapp.restaurant_index import RestaurantIndex
+
+BATCH_SIZE = 1000
+
+
+def get_last_pk(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return last or 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу детерминированными ресторанами, товарами, меню '
+        'и заказами для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=10)
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=100)
+        parser.add_argument(
+            '--availability',
+            type=float,
+            default=0.8,
+            help='Доля позиций меню, доступных в ресторане.'
+        )
+        parser.add_argument(
+            '--items-per-order',
+            type=int,
+            default=3,
+            help='Сколько разных товаров в одном заказе.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        geocoder = StubGeocoder()
+
+        with transaction.atomic():
+            restaurants = self.create_restaurants(geocoder, options['restaurants'])
+            products = self.create_products(rng, options['products'])
+            RestaurantMenuItem.objects.bulk_create([
+                RestaurantMenuItem(
+                    restaurant=restaurant,
+                    product=product,
+                    availability=rng.random() < options['availability'],
+                )
+                for restaurant in restaurants
+                for product in products
+            ], batch_size=BATCH_SIZE)
+            orders = self.create_orders(
+                rng,
+                geocoder,
+                restaurants,
+                products,
+                options['orders'],
+                options['items_per_order'],
+            )
+
+        # bulk_create не отправляет сигналы, поэтому кэши и счётчики
+        # обновляются явно.
+        Restaurant.refresh_open_orders_count()
+        RestaurantIndex.publish_changes([restaurant.pk for restaurant in restaurants])
+        products_payload.invalidate()
+
+        self.stdout.write(
+            f'Создано ресторанов: {len(restaurants)}, товаров: {len(products)}, '
+            f'заказов: {len(orders)}'
+        )
+
+    @staticmethod
+    def save_locations(geocoder, addresses):
+        """Сохраняет координаты адресов, чтобы замеры не ходили в геокодер."""
+        received_at = timezone.now()
+        locations = []
+        for address in addresses:
+            longitude, latitude = geocoder.fetch_coordinates(address)
+            locations.append(Location(
+                address=address,
+                longitude=float(longitude),
+                latitude=float(latitude),
+                received_at=received_at,
+            ))
+        Location.objects.bulk_create(
+            locations,
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        return {
+            location.address: (location.longitude, location.latitude)
+            for location in locations
+        }
+
+    def create_restaurants(self, geocoder, count):
+        addresses = [
+            f'Москва, улица Замеров, дом {index}' for index in range(count)
+        ]
+        coordinates = self.save_locations(geocoder, addresses)
+
+        last_pk = get_last_pk(Restaurant)
+        Restaurant.objects.bulk_create([
+            Restaurant(
+                name=f'Ресторан {index}',
+                address=address,
+                longitude=coordinates[address][0],
+                latitude=coordinates[address][1],
+            )
+            for index, address in enumerate(addresses)
+        ])
+        return list(Restaurant.objects.filter(pk__gt=last_pk).order_by('pk'))
+
+    @staticmethod
+    def create_products(rng, count):
+        categories = [
+            ProductCategory.objects.create(name=f'Категория замеров {index}')
+            for index in range(3)
+        ]
+        last_pk = get_last_pk(Product)
+        Product.objects.bulk_create([
+            Product(
+                name=f'Товар замеров {index}',
+                category=rng.choice(categories),
+                price=Decimal(rng.randrange(100, 1000)),
+                image='benchmark.jpg',
+            )
+            for index in range(count)
+        ], batch_size=BATCH_SIZE)
+        return list(Product.objects.filter(pk__gt=last_pk).order_by('pk'))
+
+    def create_orders(self, rng, geocoder, restaurants, products, count,
+                      items_per_order):
+        statuses = (
+            [Order.UNPROCESSED] * 6
+            + [Order.GOING_TO] * 2
+            + [Order.DELIVERED, Order.COMPLETED]
+        )
+        addresses = [
+            f'Москва, Заказной проезд, дом {index}' for index in range(count)
+        ]
+        self.save_locations(geocoder, addresses)
+
+        carts = []
+        orders = []
+        for address in addresses:
+            cart = [
+                (product, rng.randint(1, 5))
+                for product in rng.sample(
+                    products,
+                    min(items_per_order, len(products))
+                )
+            ]
+            status = rng.choice(statuses)
+            carts.append(cart)
+            orders.append(Order(
+                address=address,
+                firstname='Замер',
+                lastname='Нагрузочный',
+                phonenumber='+79001234567',
+                method_payment=rng.choice(['E', 'C']),
+                status=status,
+                serving_restaurant=(
+                    None if status == Order.UNPROCESSED
+                    else rng.choice(restaurants)
+                ),
+                total_cost=sum(
+                    product.price * quantity for product, quantity in cart
+                ),
+            ))
+        last_pk = get_last_pk(Order)
+        Order.objects.bulk_create(orders, batch_size=BATCH_SIZE)
+
+        # SQLite не возвращает первичные ключи из bulk_create.
+        orders = list(Order.objects.filter(pk__gt=last_pk).order_by('pk'))
+        OrderElement.objects.bulk_create([
+            OrderElement(
+                order=order,
+                product=product,
+                quantity=quantity,
+                price=product.price,
+            )
+            for order, cart in zip(orders, carts)
+            for product, quantity in cart
+        ], batch_size=BATCH_SIZE)
+        return orders
@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def fill_restaurant_coordinates(apps, schema_editor):
+    Restaurant = apps.get_model('foodcartapp', 'Restaurant')
+    Location = apps.get_model('geolocation', 'Location')
+
+    restaurants = Restaurant.objects.all()
+    locations = {
+        location.address: location
+        for location in Location.objects.filter(
+            address__in=restaurants.values('address')
+        )
+    }
+
+    for restaurant in restaurants:
+        location = locations.get(restaurant.address)
+        if location:
+            restaurant.longitude = location.longitude
+            restaurant.latitude = location.latitude
+            restaurant.save(update_fields=['longitude', 'latitude'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0058_alter_orderelement_price'),
+        ('geolocation', '0005_geocodetask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='широта'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='долгота'),
+        ),
+        migrations.RunPython(
+            fill_restaurant_coordinates,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,52 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import migrations
+
+BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def create_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+
+    for order, (title, filename, text) in enumerate(BANNERS):
+        banner = Banner(title=title, text=text, order=order)
+
+        # Картинка копируется, только если её ещё нет: иначе каждая
+        # миграция новой базы, в том числе тестовой, оставляла бы
+        # в MEDIA_ROOT ещё одну копию.
+        if banner.image.storage.exists(filename):
+            banner.image.name = filename
+        else:
+            with open(os.path.join(settings.BASE_DIR, 'assets', filename), 'rb') as image:
+                banner.image.save(filename, File(image), save=False)
+
+        banner.save()
+
+
+def delete_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    banners = Banner.objects.filter(title__in=[title for title, _, _ in BANNERS])
+    image_names = set(banners.values_list('image', flat=True))
+    banners.delete()
+
+    storage = Banner._meta.get_field('image').storage
+    used_image_names = set(Banner.objects.values_list('image', flat=True))
+    for image_name in image_names - used_image_names:
+        storage.delete(image_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0060_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_banners, delete_banners),
+    ]
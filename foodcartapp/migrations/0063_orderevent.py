@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 12:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0062_order_manager_list_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.IntegerField(db_index=True, verbose_name='ID заказа')),
+                ('kind', models.CharField(choices=[('created', 'Новый заказ'), ('status', 'Смена статуса'), ('restaurant', 'Назначен ресторан')], max_length=20, verbose_name='Событие')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Данные заказа')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Произошло в')),
+            ],
+            options={
+                'verbose_name': 'Событие заказа',
+                'verbose_name_plural': 'События заказов',
+            },
+        ),
+    ]
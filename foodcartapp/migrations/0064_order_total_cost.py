@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 12:01
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_total_cost(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderElement = apps.get_model('foodcartapp', 'OrderElement')
+
+    costs = (
+        OrderElement.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(cost=Sum(F('quantity') * F('price')))
+        .values('cost')
+    )
+    Order.objects.update(
+        total_cost=Coalesce(
+            Subquery(costs, output_field=models.DecimalField()),
+            Value(0),
+            output_field=models.DecimalField()
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0063_orderevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Стоимость'),
+        ),
+        migrations.RunPython(fill_total_cost, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-18 12:11
+
+import django.core.serializers.json
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0065_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIntake',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tracking_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Номер для отслеживания')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Проверенные данные заказа')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('processed', 'Оформлен'), ('failed', 'Ошибка')], db_index=True, default='queued', max_length=20, verbose_name='Статус')),
+                ('order_id', models.IntegerField(blank=True, null=True, verbose_name='ID заказа')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Принят в')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Обработан в')),
+            ],
+            options={
+                'verbose_name': 'Заказ в очереди приёма',
+                'verbose_name_plural': 'Очередь приёма заказов',
+            },
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=200, verbose_name='Код ответа'),
+        ),
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='order_id',
+            field=models.IntegerField(blank=True, help_text='Пусто, если заказ принят в очередь приёма', null=True, verbose_name='ID заказа'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-18 12:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+GOING_TO = 1
+
+
+def fill_open_orders_count(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    Restaurant = apps.get_model('foodcartapp', 'Restaurant')
+
+    counts = (
+        Order.objects
+        .filter(serving_restaurant=OuterRef('pk'), status=GOING_TO)
+        .values('serving_restaurant')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    Restaurant.objects.update(
+        open_orders_count=Coalesce(
+            Subquery(counts, output_field=models.IntegerField()),
+            Value(0)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0066_orderintake'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='open_orders_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='заказов в сборке'),
+        ),
+        migrations.RunPython(fill_open_orders_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-18 12:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0067_restaurant_open_orders_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID заказа')),
+                ('address', models.CharField(max_length=200, verbose_name='Адрес доставки')),
+                ('firstname', models.CharField(max_length=50, verbose_name='Имя')),
+                ('lastname', models.CharField(max_length=50, verbose_name='Фамилия')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(max_length=128, region=None, verbose_name='Телефон')),
+                ('status', models.SmallIntegerField(choices=[(0, 'Необработан'), (1, 'Собирается'), (2, 'Доставляется'), (9, 'Завершён')], default=9, verbose_name='Статус заказа')),
+                ('method_payment', models.CharField(choices=[('E', 'Электронно'), ('C', 'Наличностью')], max_length=1, verbose_name='Способ оплаты')),
+                ('comment', models.TextField(blank=True, verbose_name='Комментарий')),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Стоимость')),
+                ('created_at', models.DateTimeField(db_index=True, verbose_name='Оформлен в')),
+                ('called_at', models.DateTimeField(blank=True, null=True, verbose_name='Позвонили в')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Доставили в')),
+                ('archived_at', models.DateTimeField(db_index=True, verbose_name='Перенесён в архив')),
+                ('serving_restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_orders', to='foodcartapp.restaurant', verbose_name='Обслуживающий ресторан')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архив заказов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderElement',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID элемента')),
+                ('quantity', models.IntegerField(verbose_name='Количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Цена')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='elements', to='foodcartapp.archivedorder', verbose_name='Заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_order_elements', to='foodcartapp.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'Элемент архивного заказа',
+                'verbose_name_plural': 'Элементы архивных заказов',
+            },
+        ),
+    ]
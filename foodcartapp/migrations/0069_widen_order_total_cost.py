@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0068_archived_orders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedorder',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Стоимость'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Стоимость'),
+        ),
+    ]
@@ -1,15 +1,49 @@
-from collections import defaultdict
-from copy import copy
-
+import hashlib
+import json
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Count, F, Prefetch, Sum
+from django.db import connections, models, transaction
+from django.db.models import (Count, F, Max, OuterRef, Prefetch, Q, Subquery,
+                              Sum, Value)
+from django.db.models.functions import Coalesce, Greatest
+from django.urls import reverse
+from django.utils import timezone
+from geolocation.models import GeocodeTask
 from phonenumber_field.modelfields import PhoneNumberField
 
 
-class OrderQuerySet(models.QuerySet):
+class OrderHistoryQuerySet(models.QuerySet):
+    """Методы, общие для заказов из основной таблицы и из архива."""
+
+    def with_elements(self):
+        """Подгружает элементы заказов вместе с продуктами одним запросом."""
+        element_model = self.model._meta.get_field('elements').related_model
+        return self.prefetch_related(
+            Prefetch(
+                'elements',
+                queryset=element_model.objects.select_related('product')
+            )
+        )
+
+    def created_between(self, start, end):
+        """Возвращает заказы, оформленные с start включительно до end."""
+        return self.filter(created_at__gte=start, created_at__lt=end)
+
+
+class OrderQuerySet(OrderHistoryQuerySet):
     def get_cost(self):
-        """Возвращает стоимость заказа."""
+        """Возвращает стоимость заказа, посчитанную по его элементам.
+
+        Для списков заказов используйте сохранённое поле total_cost,
+        этот метод нужен для его пересчёта и сверки.
+        """
         return self.annotate(
             cost=Sum(
                 F('elements__quantity') *
@@ -17,52 +51,185 @@ class OrderQuerySet(models.QuerySet):
             )
         )
 
+    def refresh_total_cost(self):
+        """Пересчитывает сохранённую стоимость заказов одним запросом."""
+        costs = (
+            OrderElement.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(cost=Sum(F('quantity') * F('price')))
+            .values('cost')
+        )
+        return self.update(
+            total_cost=Coalesce(
+                Subquery(costs, output_field=models.DecimalField()),
+                Value(0),
+                output_field=models.DecimalField()
+            )
+        )
+
+    def create_with_elements(self, orders_elements, batch_size=None):
+        """Создаёт заказы вместе с элементами пачками.
+
+        Принимает пары (заказ, список элементов) из несохранённых объектов
+        и сам считает стоимость заказов. bulk_create не отправляет сигналы,
+        поэтому события доски заказов и геокодирование адресов ставятся
+        явно. Вызывается внутри транзакции.
+        """
+        if not orders_elements:
+            return []
+
+        orders = []
+        for order, elements in orders_elements:
+            order.total_cost = sum(
+                element.price * element.quantity for element in elements
+            )
+            orders.append(order)
+
+        connection = connections[self.db]
+        signals_sent = False
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.bulk_create(orders, batch_size=batch_size)
+        elif connection.vendor == 'sqlite':
+            # SQLite не возвращает id из bulk_create, поэтому id назначаются
+            # заранее. Если параллельная запись успеет занять эти id,
+            # вставка упадёт с IntegrityError, а не перепутает заказы.
+            with transaction.atomic(using=self.db):
+                first_id = self.get_next_sqlite_id()
+                for order_id, order in enumerate(orders, start=first_id):
+                    order.id = order_id
+                self.bulk_create(orders, batch_size=batch_size)
+        else:
+            # Остальные базы без RETURNING: заказы сохраняются по одному,
+            # и событие доски пишет сигнал post_save.
+            for order in orders:
+                order.save(force_insert=True)
+            signals_sent = True
+
+        if not signals_sent:
+            order_ids = [order.id for order in orders]
+            transaction.on_commit(
+                lambda: OrderEvent.record(order_ids, OrderEvent.CREATED)
+            )
+            Restaurant.change_open_orders_count(Counter(
+                order.serving_restaurant_id
+                for order in orders
+                if order.status == Order.GOING_TO and order.serving_restaurant_id
+            ))
+
+        order_elements = []
+        for order, elements in orders_elements:
+            for element in elements:
+                element.order = order
+                order_elements.append(element)
+        OrderElement.objects.bulk_create(order_elements, batch_size=batch_size)
+
+        addresses = {order.address for order in orders}
+        transaction.on_commit(lambda: GeocodeTask.enqueue(addresses))
+
+        return orders
+
+    def get_next_sqlite_id(self):
+        """Возвращает id, который SQLite выдал бы следующему заказу.
+
+        Счётчик AUTOINCREMENT не откатывается при удалении заказов,
+        поэтому id удалённых и перенесённых в архив заказов не повторяются.
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s',
+                [self.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+
+        last_id = max(
+            row[0] if row else 0,
+            self.aggregate(last_id=Max('pk'))['last_id'] or 0
+        )
+        return last_id + 1
+
     def get_manager_orders(self):
         """Возвращает заказы менеджера."""
-        return self.exclude(status=Order.COMPLETED).order_by('status')
+        return (
+            self.exclude(status=Order.COMPLETED)
+            .order_by('status', 'created_at', 'id')
+        )
 
-    def get_serving_restaurants(self):
-        """Возвращает список ресторанов."""
-        menu_items = list(RestaurantMenuItem.objects
-                          .filter(availability=True)
-                          .prefetch_related('restaurant'))
+    def after(self, cursor):
+        """Возвращает заказы, идущие после курсора.
+
+        Курсор — тройка (статус, дата оформления, id) последнего заказа
+        предыдущей страницы, в порядке сортировки get_manager_orders.
+        """
+        status, created_at, order_id = cursor
+        return self.filter(
+            Q(status__gt=status) |
+            Q(status=status, created_at__gt=created_at) |
+            Q(status=status, created_at=created_at, id__gt=order_id)
+        )
 
-        product_in_restaurants = defaultdict(set)
+    def get_serving_restaurants(self):
+        """Возвращает список ресторанов.
+
+        Элементы заказов загружаются одним запросом, а каждый ресторан
+        представлен одним объектом, общим для всех заказов, поэтому
+        данные, зависящие от заказа, на ресторане хранить нельзя.
+        """
+        orders = self.prefetch_related(
+            Prefetch(
+                'elements',
+                queryset=OrderElement.objects.only('order_id', 'product_id')
+            )
+        )
 
-        for menu_item in menu_items:
-            product_in_restaurants[menu_item.product_id].add(
-                menu_item.restaurant_id)
+        order_products = {}
 
-        for order in self:
-            if order.status != Order.UNPROCESSED and not order.serving_restaurant:
-                order.serving_restaurants = []
-                continue
+        for order in orders:
+            order_products[order.id] = [
+                element.product_id
+                for element in order.elements.all()  # type: ignore
+            ]
 
-            if order.serving_restaurant:
-                order.serving_restaurants = [order.serving_restaurant]
-                continue
+        product_in_restaurants = (
+            RestaurantMenuItem.objects
+            .get_availability_index(  # type: ignore
+                set().union(*order_products.values())
+            )
+        )
 
-            restaurant_ids = []
+        order_restaurant_ids = {}
 
-            for element in order.elements.all():  # type: ignore
-                restaurant_ids.append(
-                    product_in_restaurants[element.product_id]
-                )
+        for order in orders:
+            products = order_products[order.id]
 
-            if not restaurant_ids:
-                order.serving_restaurants = []
+            if order.serving_restaurant_id or order.status != Order.UNPROCESSED \
+                    or not products:
                 continue
 
-            restaurant_ids = set.intersection(*restaurant_ids)
+            order_restaurant_ids[order.id] = frozenset.intersection(
+                *(product_in_restaurants[product_id] for product_id in products)
+            )
 
-            restaurants = set(
-                copy(menu_item.restaurant) for menu_item in menu_items
-                if menu_item.restaurant.id in restaurant_ids
+        restaurants = Restaurant.objects.in_bulk(
+            set().union(
+                *order_restaurant_ids.values(),
+                {order.serving_restaurant_id for order in orders} - {None}
             )
+        )
+
+        for order in orders:
+            if order.serving_restaurant_id:
+                order.serving_restaurants = [
+                    restaurants[order.serving_restaurant_id]
+                ]
+                continue
 
-            order.serving_restaurants = restaurants
+            order.serving_restaurants = [
+                restaurants[restaurant_id]
+                for restaurant_id in order_restaurant_ids.get(order.id, ())
+            ]
 
-        return self
+        return orders
 
 
 class Restaurant(models.Model):
@@ -80,6 +247,23 @@ class Restaurant(models.Model):
         max_length=50,
         blank=True,
     )
+    latitude = models.FloatField(
+        'широта',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    longitude = models.FloatField(
+        'долгота',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    open_orders_count = models.PositiveIntegerField(
+        'заказов в сборке',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'ресторан'
@@ -88,6 +272,47 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
+    def get_lonlat(self):
+        """Возвращает координаты в виде (долгота, широта)."""
+        if self.longitude is None or self.latitude is None:
+            return None
+
+        return self.longitude, self.latitude
+
+    @staticmethod
+    def change_open_orders_count(deltas):
+        """Сдвигает счётчики заказов в сборке.
+
+        deltas — словарь {id ресторана: на сколько изменился счётчик}.
+        """
+        for restaurant_id, delta in deltas.items():
+            if not delta:
+                continue
+            Restaurant.objects.filter(pk=restaurant_id).update(
+                open_orders_count=Greatest(F('open_orders_count') + delta, 0)
+            )
+
+    @staticmethod
+    def refresh_open_orders_count():
+        """Пересчитывает счётчики заказов в сборке по таблице заказов.
+
+        Нужен для первичного заполнения и после массовых вставок в обход
+        сигналов, в остальное время счётчики меняются на лету.
+        """
+        counts = (
+            Order.objects
+            .filter(serving_restaurant=OuterRef('pk'), status=Order.GOING_TO)
+            .values('serving_restaurant')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        return Restaurant.objects.update(
+            open_orders_count=Coalesce(
+                Subquery(counts, output_field=models.IntegerField()),
+                Value(0)
+            )
+        )
+
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
@@ -156,6 +381,65 @@ class Product(models.Model):
         return self.name
 
 
+class RestaurantMenuItemQuerySet(models.QuerySet):
+    AVAILABILITY_CACHE_KEY = 'foodcartapp:availability:{product_id}'
+    # Ограничивает жизнь записи, которую читатель мог достроить
+    # по данным, ещё не видевшим изменение меню.
+    AVAILABILITY_CACHE_TTL = 10 * 60
+
+    def get_availability_index(self, product_ids):
+        """Возвращает индекс доступности: id продукта -> id ресторанов.
+
+        Индекс хранится в общем кэше по ключу на каждый продукт и
+        сбрасывается сигналами после коммита изменений меню, а
+        отсутствующие в кэше продукты достраиваются одним запросом.
+        """
+        keys = {
+            self.AVAILABILITY_CACHE_KEY.format(product_id=product_id): product_id
+            for product_id in product_ids
+        }
+        cached = cache.get_many(keys)
+        index = {keys[key]: restaurant_ids for key, restaurant_ids in cached.items()}
+
+        missing_product_ids = [
+            product_id for key, product_id in keys.items() if key not in cached
+        ]
+        if missing_product_ids:
+            index.update(self._build_availability_index(missing_product_ids))
+
+        return index
+
+    def invalidate_availability(self, product_ids):
+        """Сбрасывает индекс доступности продуктов."""
+        cache.delete_many([
+            self.AVAILABILITY_CACHE_KEY.format(product_id=product_id)
+            for product_id in product_ids
+        ])
+
+    def _build_availability_index(self, product_ids):
+        index = {product_id: set() for product_id in product_ids}
+
+        menu_items = (
+            self.filter(product_id__in=product_ids, availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+        for product_id, restaurant_id in menu_items:
+            index[product_id].add(restaurant_id)
+
+        index = {
+            product_id: frozenset(restaurant_ids)
+            for product_id, restaurant_ids in index.items()
+        }
+        cache.set_many(
+            {
+                self.AVAILABILITY_CACHE_KEY.format(product_id=product_id): restaurant_ids
+                for product_id, restaurant_ids in index.items()
+            },
+            timeout=self.AVAILABILITY_CACHE_TTL
+        )
+        return index
+
+
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
         Restaurant,
@@ -175,6 +459,8 @@ class RestaurantMenuItem(models.Model):
         db_index=True
     )
 
+    objects = RestaurantMenuItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'пункт меню ресторана'
         verbose_name_plural = 'пункты меню ресторана'
@@ -186,6 +472,39 @@ class RestaurantMenuItem(models.Model):
         return f"{self.restaurant.name} - {self.product.name}"
 
 
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=50
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    image = models.ImageField(
+        'картинка'
+    )
+    order = models.PositiveIntegerField(
+        'порядок',
+        default=0,
+        db_index=True,
+    )
+    is_active = models.BooleanField(
+        'показывать',
+        default=True,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['order', 'id']
+
+    def __str__(self):
+        return self.title
+
+
 class Order(models.Model):
     """Заказы."""
     UNPROCESSED = 0
@@ -236,6 +555,13 @@ class Order(models.Model):
         verbose_name='Комментарий',
         blank=True,
     )
+    total_cost = models.DecimalField(
+        verbose_name='Стоимость',
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
     serving_restaurant = models.ForeignKey(
         Restaurant,
         verbose_name='Обслуживающий ресторан',
@@ -265,6 +591,12 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [
+            models.Index(
+                fields=['status', 'created_at', 'id'],
+                name='order_manager_list_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.lastname} {self.firstname} - {self.address}'
@@ -301,3 +633,358 @@ class OrderElement(models.Model):
 
     def __str__(self):
         return f'{self.product} - {self.quantity} шт.'
+
+
+class ArchivedOrder(models.Model):
+    """Завершённые заказы, перенесённые из таблицы заказов.
+
+    id совпадает с id исходного заказа, поэтому ссылки на заказ
+    в событиях, ключах идемпотентности и очереди приёма остаются верными.
+    """
+    id = models.IntegerField(
+        verbose_name='ID заказа',
+        primary_key=True
+    )
+    address = models.CharField(
+        verbose_name='Адрес доставки',
+        max_length=200
+    )
+    firstname = models.CharField(
+        verbose_name='Имя',
+        max_length=50
+    )
+    lastname = models.CharField(
+        verbose_name='Фамилия',
+        max_length=50
+    )
+    phonenumber = PhoneNumberField(
+        verbose_name='Телефон'
+    )
+    status = models.SmallIntegerField(
+        verbose_name='Статус заказа',
+        choices=Order.ORDER_STATUS,
+        default=Order.COMPLETED
+    )
+    method_payment = models.CharField(
+        verbose_name='Способ оплаты',
+        choices=Order.PAYMENT,
+        max_length=1
+    )
+    comment = models.TextField(
+        verbose_name='Комментарий',
+        blank=True,
+    )
+    total_cost = models.DecimalField(
+        verbose_name='Стоимость',
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+    )
+    serving_restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='Обслуживающий ресторан',
+        related_name='archived_orders',
+        on_delete=models.DO_NOTHING,
+        blank=True,
+        null=True,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Оформлен в',
+        db_index=True
+    )
+    called_at = models.DateTimeField(
+        verbose_name='Позвонили в',
+        blank=True,
+        null=True
+    )
+    delivered_at = models.DateTimeField(
+        verbose_name='Доставили в',
+        blank=True,
+        null=True
+    )
+    archived_at = models.DateTimeField(
+        verbose_name='Перенесён в архив',
+        db_index=True
+    )
+
+    objects = OrderHistoryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Архивный заказ'
+        verbose_name_plural = 'Архив заказов'
+
+    def __str__(self):
+        return f'{self.lastname} {self.firstname} - {self.address}'
+
+
+class ArchivedOrderElement(models.Model):
+    """Элементы архивных заказов."""
+    id = models.IntegerField(
+        verbose_name='ID элемента',
+        primary_key=True
+    )
+    order = models.ForeignKey(
+        ArchivedOrder,
+        verbose_name='Заказ',
+        related_name='elements',
+        on_delete=models.CASCADE,
+    )
+    product = models.ForeignKey(
+        Product,
+        verbose_name='Продукт',
+        related_name='archived_order_elements',
+        on_delete=models.CASCADE,
+    )
+    quantity = models.IntegerField(
+        verbose_name='Количество'
+    )
+    price = models.DecimalField(
+        verbose_name='Цена',
+        max_digits=8,
+        decimal_places=2
+    )
+
+    class Meta:
+        verbose_name = 'Элемент архивного заказа'
+        verbose_name_plural = 'Элементы архивных заказов'
+
+    def __str__(self):
+        return f'{self.product} - {self.quantity} шт.'
+
+
+class OrderEvent(models.Model):
+    """Изменение заказа для живой доски заказов менеджера."""
+    CREATED = 'created'
+    STATUS_CHANGED = 'status'
+    RESTAURANT_ASSIGNED = 'restaurant'
+
+    KINDS = (
+        (CREATED, 'Новый заказ'),
+        (STATUS_CHANGED, 'Смена статуса'),
+        (RESTAURANT_ASSIGNED, 'Назначен ресторан'),
+    )
+
+    # Дольше этого события не хранятся: доска догружает только свежие.
+    EVENTS_TTL = timedelta(days=1)
+
+    order_id = models.IntegerField(
+        verbose_name='ID заказа',
+        db_index=True
+    )
+    kind = models.CharField(
+        verbose_name='Событие',
+        choices=KINDS,
+        max_length=20
+    )
+    payload = models.JSONField(
+        verbose_name='Данные заказа',
+        encoder=DjangoJSONEncoder
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Произошло в',
+        db_index=True,
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Событие заказа'
+        verbose_name_plural = 'События заказов'
+
+    def __str__(self):
+        return f'{self.order_id} - {self.get_kind_display()}'
+
+    @staticmethod
+    def record(order_ids, kind):
+        """Записывает события с текущим состоянием заказов.
+
+        Заодно удаляет события старше EVENTS_TTL.
+        """
+        orders = (
+            Order.objects
+            .filter(pk__in=order_ids)
+            .select_related('serving_restaurant')
+        )
+
+        OrderEvent.objects.bulk_create([
+            OrderEvent(
+                order_id=order.id,
+                kind=kind,
+                payload={
+                    'id': order.id,
+                    'status': order.status,
+                    'status_display': order.get_status_display(),
+                    'method_payment': order.get_method_payment_display(),
+                    'cost': order.total_cost,
+                    'client': f'{order.firstname} {order.lastname}',
+                    'phonenumber': str(order.phonenumber),
+                    'address': order.address,
+                    'comment': order.comment,
+                    'restaurant': str(order.serving_restaurant or ''),
+                    'url': reverse(
+                        'admin:foodcartapp_order_change',
+                        args=(order.id,)
+                    ),
+                },
+            )
+            for order in orders
+        ])
+
+        OrderEvent.objects.filter(
+            created_at__lt=timezone.now() - OrderEvent.EVENTS_TTL
+        ).delete()
+
+
+class IdempotencyKey(models.Model):
+    """Ключ идемпотентности, с которым клиент оформил заказ.
+
+    Повтор запроса с тем же ключом получает сохранённый ответ
+    и не создаёт заказ заново.
+    """
+    KEY_MAX_LENGTH = 100
+
+    key = models.CharField(
+        verbose_name='Ключ',
+        max_length=KEY_MAX_LENGTH,
+        unique=True
+    )
+    fingerprint = models.CharField(
+        verbose_name='Хэш тела запроса',
+        max_length=64
+    )
+    order_id = models.IntegerField(
+        verbose_name='ID заказа',
+        blank=True,
+        null=True,
+        help_text='Пусто, если заказ принят в очередь приёма'
+    )
+    response = models.JSONField(
+        verbose_name='Ответ',
+        encoder=DjangoJSONEncoder
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа',
+        default=200
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создан в',
+        db_index=True,
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+
+    def __str__(self):
+        return f'{self.key} - {self.order_id}'
+
+    @staticmethod
+    def get_fingerprint(data):
+        """Возвращает хэш тела запроса, не зависящий от порядка ключей."""
+        content = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_expiration_time():
+        return timezone.now() - timedelta(seconds=settings.ORDER_IDEMPOTENCY_TTL)
+
+    @staticmethod
+    def find(key):
+        """Возвращает действующую запись по ключу или None."""
+        return IdempotencyKey.objects.filter(
+            key=key,
+            created_at__gte=IdempotencyKey.get_expiration_time()
+        ).first()
+
+    @staticmethod
+    def remember(key, fingerprint, order_id, response, status_code=200):
+        """Сохраняет ответ на запрос с ключом.
+
+        Заодно удаляет записи старше ORDER_IDEMPOTENCY_TTL, в том числе
+        просроченную запись с тем же ключом.
+        """
+        IdempotencyKey.objects.filter(
+            created_at__lt=IdempotencyKey.get_expiration_time()
+        ).delete()
+
+        return IdempotencyKey.objects.create(
+            key=key,
+            fingerprint=fingerprint,
+            order_id=order_id,
+            response=response,
+            status_code=status_code,
+        )
+
+
+class OrderIntake(models.Model):
+    """Заказ, принятый в очередь и ещё не записанный в таблицы заказов."""
+    QUEUED = 'queued'
+    PROCESSED = 'processed'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (PROCESSED, 'Оформлен'),
+        (FAILED, 'Ошибка'),
+    )
+
+    tracking_id = models.UUIDField(
+        verbose_name='Номер для отслеживания',
+        unique=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    payload = models.JSONField(
+        verbose_name='Проверенные данные заказа',
+        encoder=DjangoJSONEncoder
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        choices=STATUSES,
+        default=QUEUED,
+        max_length=20,
+        db_index=True
+    )
+    order_id = models.IntegerField(
+        verbose_name='ID заказа',
+        blank=True,
+        null=True
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Принят в',
+        auto_now_add=True
+    )
+    processed_at = models.DateTimeField(
+        verbose_name='Обработан в',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        verbose_name = 'Заказ в очереди приёма'
+        verbose_name_plural = 'Очередь приёма заказов'
+
+    def __str__(self):
+        return f'{self.tracking_id} - {self.get_status_display()}'
+
+    def build_order(self):
+        """Возвращает несохранённые заказ и его элементы из данных очереди."""
+        order = Order(
+            address=self.payload['address'],
+            firstname=self.payload['firstname'],
+            lastname=self.payload['lastname'],
+            phonenumber=self.payload['phonenumber'],
+        )
+        elements = [
+            OrderElement(
+                product_id=element['product'],
+                quantity=element['quantity'],
+                price=Decimal(element['price']),
+            )
+            for element in self.payload['products']
+        ]
+        return order, elements
@@ -0,0 +1,208 @@
+import gzip
+import hashlib
+import json
+import re
+import uuid
+from collections import namedtuple
+from threading import Lock
+
+import brotli
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import Banner, Product
+
+CachedPayload = namedtuple('CachedPayload', 'bodies digest last_modified')
+
+# Поддерживаемые кодировки в порядке предпочтения.
+CONTENT_ENCODINGS = ('br', 'gzip')
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?')
+
+
+class VersionedPayload:
+    """Сериализованный ответ API, закэшированный до смены версии.
+
+    Номер версии хранится в общем кэше и меняется при изменении данных,
+    поэтому каждый процесс держит у себя готовые байты ответа и на
+    горячем пути делает только одно обращение к общему кэшу.
+
+    Версия живёт PAYLOAD_VERSION_TTL секунд: если кэш не общий, другие
+    процессы не узнают о смене версии, и устаревший ответ они отдают
+    не дольше этого срока.
+    """
+    # Номер формата в ключах меняется вместе с CachedPayload, чтобы
+    # после выкладки не читать из кэша записи в прежнем формате.
+    VERSION_CACHE_KEY = 'foodcartapp:payload:v2:{name}:version'
+    PAYLOAD_CACHE_KEY = 'foodcartapp:payload:v2:{name}:{version}'
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self._version = None
+        self._payload = None
+        self._lock = Lock()
+
+    def get(self):
+        """Возвращает актуальный CachedPayload."""
+        version_key = self.VERSION_CACHE_KEY.format(name=self.name)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, uuid.uuid4().hex, timeout=settings.PAYLOAD_VERSION_TTL)
+            version = cache.get(version_key)
+
+        with self._lock:
+            if version == self._version:
+                return self._payload
+
+        payload_key = self.PAYLOAD_CACHE_KEY.format(name=self.name, version=version)
+        payload = cache.get(payload_key)
+
+        if payload is None:
+            payload = self.serialize(self.build())
+            cache.set(payload_key, payload, timeout=settings.PAYLOAD_VERSION_TTL)
+
+        with self._lock:
+            self._version, self._payload = version, payload
+
+        return payload
+
+    def invalidate(self):
+        """Помечает закэшированный ответ устаревшим во всех процессах."""
+        cache.set(
+            self.VERSION_CACHE_KEY.format(name=self.name),
+            uuid.uuid4().hex,
+            timeout=settings.PAYLOAD_VERSION_TTL
+        )
+
+    @staticmethod
+    def serialize(content):
+        body = json.dumps(
+            content,
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ).encode('utf-8')
+
+        return CachedPayload(
+            bodies={
+                None: body,
+                'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+                'br': brotli.compress(body, quality=11),
+            },
+            digest=hashlib.sha1(body).hexdigest(),
+            last_modified=int(timezone.now().timestamp()),
+        )
+
+
+class VersionedSnapshot(VersionedPayload):
+    """Данные, закэшированные до смены версии как есть, без сериализации."""
+
+    @staticmethod
+    def serialize(content):
+        return content
+
+
+def choose_content_encoding(request):
+    """Выбирает сжатие ответа по заголовку Accept-Encoding."""
+    accepted = {}
+    for value in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        if match := ACCEPT_ENCODING_RE.match(value):
+            encoding, quality = match.groups()
+            try:
+                accepted[encoding.lower()] = float(quality or 1)
+            except ValueError:
+                continue
+
+    for encoding in CONTENT_ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+
+    return None
+
+
+def payload_response(request, payload):
+    """Отдаёт закэшированный ответ с учётом условных заголовков запроса.
+
+    Тело отдаётся заранее сжатым, если клиент поддерживает сжатие.
+    """
+    encoding = choose_content_encoding(request)
+    etag = quote_etag(
+        f'{payload.digest}-{encoding}' if encoding else payload.digest
+    )
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=payload.last_modified,
+    )
+
+    if response is None:
+        response = HttpResponse(
+            payload.bodies[encoding],
+            content_type='application/json'
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(payload.last_modified)
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def build_products():
+    products = Product.objects.select_related('category').available()
+
+    dumped_products = []
+    for product in products:
+        dumped_product = {
+            'id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'special_status': product.special_status,
+            'description': product.description,
+            'category': {
+                'id': product.category.id,
+                'name': product.category.name,
+            } if product.category else None,
+            'image': product.image.url,
+            'restaurant': {
+                'id': product.id,
+                'name': product.name,
+            }
+        }
+        dumped_products.append(dumped_product)
+
+    return dumped_products
+
+
+products_payload = VersionedPayload('products', build_products)
+
+
+def build_product_prices():
+    return dict(Product.objects.values_list('id', 'price'))
+
+
+# Цены товаров для проверки заказов, принимаемых в очередь.
+product_prices = VersionedSnapshot('product_prices', build_product_prices)
+
+
+def build_banners():
+    return [
+        {
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
+        }
+        for banner in Banner.objects.filter(is_active=True)
+    ]
+
+
+banners_payload = VersionedPayload('banners', build_banners)
@@ -0,0 +1,101 @@
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from geolocation.spatial import GridIndex
+
+from .models import Restaurant
+
+
+class RestaurantIndex:
+    """Пространственный индекс ресторанов в памяти процесса.
+
+    Изменения ресторанов публикуются в общем кэше как номер версии и
+    список изменённых ресторанов для каждой версии. Процесс, отставший
+    на несколько версий, переиндексирует только изменённые рестораны,
+    а если журнал изменений потерян — строит индекс заново.
+
+    Кэш в памяти процесса не видит изменений из других процессов,
+    например координат, полученных командой geocode_addresses, поэтому
+    индекс старше RESTAURANT_INDEX_MAX_AGE секунд строится заново из базы.
+    """
+    VERSION_CACHE_KEY = 'foodcartapp:restaurant_index:version'
+    CHANGES_CACHE_KEY = 'foodcartapp:restaurant_index:changes:{}'
+    CHANGES_TIMEOUT = 24 * 60 * 60
+    MAX_REPLAYED_VERSIONS = 100
+    CELL_SIZE_KM = 2
+
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._built_at = None
+        self._lock = Lock()
+
+    def nearest(self, point, k=1, radius_km=None, restaurant_ids=None):
+        """Возвращает до k ближайших ресторанов в виде [(id, км), ...].
+
+        radius_km ограничивает расстояние поиска, restaurant_ids —
+        рестораны, среди которых ведётся поиск.
+        """
+        return self.get_index().nearest(point, k, radius_km, restaurant_ids)
+
+    def get_index(self):
+        """Возвращает индекс, догоняя его до актуальной версии."""
+        with self._lock:
+            version = cache.get(self.VERSION_CACHE_KEY, 0)
+
+            if self._index is not None and \
+                    monotonic() - self._built_at >= settings.RESTAURANT_INDEX_MAX_AGE:
+                self._index = None
+
+            if self._index is not None and version != self._version:
+                self._replay_changes(version)
+
+            if self._index is None:
+                self._index = GridIndex(self.CELL_SIZE_KM)
+                self._update(Restaurant.objects.all())
+                self._built_at = monotonic()
+
+            self._version = version
+            return self._index
+
+    @classmethod
+    def publish_changes(cls, restaurant_ids):
+        """Сообщает всем процессам, что рестораны изменились."""
+        cache.add(cls.VERSION_CACHE_KEY, 0, timeout=None)
+        version = cache.incr(cls.VERSION_CACHE_KEY)
+        cache.set(
+            cls.CHANGES_CACHE_KEY.format(version),
+            list(restaurant_ids),
+            timeout=cls.CHANGES_TIMEOUT
+        )
+
+    def _replay_changes(self, version):
+        versions = range(self._version + 1, version + 1)
+        if not 0 < len(versions) <= self.MAX_REPLAYED_VERSIONS:
+            self._index = None
+            return
+
+        keys = [self.CHANGES_CACHE_KEY.format(version) for version in versions]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            self._index = None
+            return
+
+        restaurant_ids = set().union(*changes.values())
+        for restaurant_id in restaurant_ids:
+            self._index.remove(restaurant_id)
+        self._update(Restaurant.objects.filter(pk__in=restaurant_ids))
+
+    def _update(self, restaurants):
+        restaurants = restaurants.filter(
+            longitude__isnull=False,
+            latitude__isnull=False
+        ).values_list('id', 'longitude', 'latitude')
+
+        for restaurant_id, longitude, latitude in restaurants:
+            self._index.add(restaurant_id, (longitude, latitude))
+
+
+restaurant_index = RestaurantIndex()
@@ -0,0 +1,206 @@
+from collections import Counter
+from threading import local
+
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from geolocation.models import GeocodeTask, Location
+from geolocation.signals import locations_updated
+
+from .models import (Banner, Order, OrderElement, OrderEvent, Product,
+                     ProductCategory, Restaurant, RestaurantMenuItem)
+from .payloads import banners_payload, product_prices, products_payload
+from .restaurant_index import RestaurantIndex
+
+# Заказы, которые удаляются в текущем потоке.
+deleting_orders = local()
+
+
+def get_deleting_order_ids():
+    if not hasattr(deleting_orders, 'ids'):
+        deleting_orders.ids = set()
+    return deleting_orders.ids
+
+
+@receiver(pre_save, sender=RestaurantMenuItem)
+def remember_menu_item_product(sender, instance, **kwargs):
+    """Запоминает прежний продукт пункта меню перед сохранением."""
+    instance.previous_product_id = (
+        RestaurantMenuItem.objects
+        .filter(pk=instance.pk)
+        .values_list('product_id', flat=True)
+        .first()
+    ) if instance.pk else None
+
+
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def invalidate_menu_item_availability(sender, instance, **kwargs):
+    """Сбрасывает индекс доступности продукта после коммита изменений меню."""
+    product_ids = {
+        instance.product_id,
+        getattr(instance, 'previous_product_id', None),
+    } - {None}
+
+    transaction.on_commit(
+        lambda: RestaurantMenuItem.objects.invalidate_availability(  # type: ignore
+            product_ids
+        )
+    )
+
+
+@receiver(pre_save, sender=Restaurant)
+def fill_restaurant_coordinates(sender, instance, **kwargs):
+    """Подставляет координаты ресторана из уже геокодированных адресов.
+
+    В очередь геокодирования адрес ставит post_save, когда сохранение
+    уже удалось.
+    """
+    coords = Location.get_coordinates(
+        instance.address,
+        geocode_missing=False,
+        enqueue_missing=False
+    )
+    instance.longitude, instance.latitude = coords or (None, None)
+
+
+@receiver(locations_updated)
+def refresh_restaurant_coordinates(sender, coordinates, **kwargs):
+    """Обновляет координаты ресторанов, стоящих по изменившимся адресам."""
+    restaurants = Restaurant.objects.filter(address__in=coordinates)
+    changed_restaurant_ids = []
+
+    for restaurant in restaurants:
+        if restaurant.get_lonlat() == coordinates[restaurant.address]:
+            continue
+
+        restaurant.longitude, restaurant.latitude = (
+            coordinates[restaurant.address] or (None, None)
+        )
+        changed_restaurant_ids.append(restaurant.id)
+        Restaurant.objects.filter(pk=restaurant.pk).update(
+            longitude=restaurant.longitude,
+            latitude=restaurant.latitude
+        )
+
+    if changed_restaurant_ids:
+        transaction.on_commit(
+            lambda: RestaurantIndex.publish_changes(changed_restaurant_ids)
+        )
+
+
+@receiver(post_save, sender=Restaurant)
+def enqueue_restaurant_geocoding(sender, instance, **kwargs):
+    """Ставит адрес ресторана в очередь фонового геокодирования."""
+    address = instance.address
+    transaction.on_commit(lambda: GeocodeTask.enqueue([address]))
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def reindex_restaurant(sender, instance, **kwargs):
+    """Обновляет ресторан в пространственном индексе."""
+    restaurant_id = instance.id
+    transaction.on_commit(
+        lambda: RestaurantIndex.publish_changes([restaurant_id])
+    )
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def invalidate_products_payload(sender, **kwargs):
+    """Сбрасывает закэшированный каталог товаров."""
+    transaction.on_commit(products_payload.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_prices(sender, **kwargs):
+    """Сбрасывает закэшированные цены товаров."""
+    transaction.on_commit(product_prices.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def invalidate_banners_payload(sender, **kwargs):
+    """Сбрасывает закэшированный список баннеров."""
+    transaction.on_commit(banners_payload.invalidate)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    """Запоминает статус и ресторан заказа перед сохранением."""
+    instance.previous_state = (
+        Order.objects
+        .filter(pk=instance.pk)
+        .values_list('status', 'serving_restaurant_id')
+        .first()
+    ) if instance.pk else None
+
+
+@receiver(post_save, sender=Order)
+def record_order_event(sender, instance, created, **kwargs):
+    """Записывает событие для живой доски заказов."""
+    previous_state = getattr(instance, 'previous_state', None)
+
+    if created or not previous_state:
+        kinds = [OrderEvent.CREATED]
+    else:
+        previous_status, previous_restaurant_id = previous_state
+        kinds = []
+        if instance.status != previous_status:
+            kinds.append(OrderEvent.STATUS_CHANGED)
+        if instance.serving_restaurant_id != previous_restaurant_id:
+            kinds.append(OrderEvent.RESTAURANT_ASSIGNED)
+
+    order_id = instance.id
+    for kind in kinds:
+        transaction.on_commit(
+            lambda kind=kind: OrderEvent.record([order_id], kind)
+        )
+
+
+@receiver(post_save, sender=Order)
+def count_restaurant_open_orders(sender, instance, **kwargs):
+    """Сдвигает счётчики заказов в сборке у прежнего и нового ресторана."""
+    previous_status, previous_restaurant_id = (
+        getattr(instance, 'previous_state', None) or (None, None)
+    )
+
+    deltas = Counter()
+    if previous_status == Order.GOING_TO and previous_restaurant_id:
+        deltas[previous_restaurant_id] -= 1
+    if instance.status == Order.GOING_TO and instance.serving_restaurant_id:
+        deltas[instance.serving_restaurant_id] += 1
+
+    Restaurant.change_open_orders_count(deltas)
+
+
+@receiver(post_delete, sender=Order)
+def uncount_deleted_order(sender, instance, **kwargs):
+    """Уменьшает счётчик заказов в сборке у ресторана удалённого заказа."""
+    if instance.status == Order.GOING_TO and instance.serving_restaurant_id:
+        Restaurant.change_open_orders_count({instance.serving_restaurant_id: -1})
+
+
+@receiver(pre_delete, sender=Order)
+def remember_deleting_order(sender, instance, **kwargs):
+    """Запоминает удаляемый заказ до каскадного удаления его элементов."""
+    get_deleting_order_ids().add(instance.pk)
+
+
+@receiver(post_delete, sender=Order)
+def forget_deleted_order(sender, instance, **kwargs):
+    get_deleting_order_ids().discard(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=OrderElement)
+def refresh_order_total_cost(sender, instance, **kwargs):
+    """Пересчитывает сохранённую стоимость заказа при изменении элементов.
+
+    Элементы удаляемого заказа удаляются раньше него самого, и
+    пересчитывать его стоимость незачем.
+    """
+    if instance.order_id in get_deleting_order_ids():
+        return
+
+    Order.objects.filter(pk=instance.order_id).refresh_total_cost()
@@ -0,0 +1,833 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import brotli
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from geolocation.cache import coordinates_cache
+from geolocation.models import GeocodeTask, Location
+
+from . import assignment, views
+from .delivery import get_delivery_routes
+from .archive import archive_chunk, archive_orders, get_archivable_orders
+from .models import (ArchivedOrder, IdempotencyKey, Order, OrderElement,
+                     OrderEvent, OrderIntake, OrderQuerySet, Product,
+                     ProductCategory, Restaurant, RestaurantMenuItem)
+from .payloads import products_payload
+from .restaurant_index import RestaurantIndex
+
+
+class AvailabilityIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = ProductCategory.objects.create(name='Бургеры')
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=category,
+            price=100
+        )
+        self.restaurant = Restaurant.objects.create(
+            name='Star Burger',
+            address='Москва'
+        )
+
+    def get_restaurant_ids(self):
+        return RestaurantMenuItem.objects.get_availability_index(
+            [self.product.id]
+        )[self.product.id]
+
+    def test_index_is_invalidated_after_commit(self):
+        self.assertEqual(self.get_restaurant_ids(), frozenset())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.create(
+                restaurant=self.restaurant,
+                product=self.product
+            )
+
+        self.assertEqual(self.get_restaurant_ids(), {self.restaurant.id})
+
+    def test_rolled_back_change_keeps_index(self):
+        self.assertEqual(self.get_restaurant_ids(), frozenset())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                RestaurantMenuItem.objects.create(
+                    restaurant=self.restaurant,
+                    product=self.product
+                )
+                transaction.set_rollback(True)
+
+        self.assertEqual(self.get_restaurant_ids(), frozenset())
+
+
+class RestaurantIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(name='Star Burger', address='Москва')
+        self.index = RestaurantIndex()
+
+    def geocode_restaurant(self):
+        # Так координаты записывает другой процесс: версия индекса
+        # меняется только в его собственном кэше.
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(longitude=37.62, latitude=55.75)
+
+    def test_keeps_index_until_it_expires(self):
+        with override_settings(RESTAURANT_INDEX_MAX_AGE=60):
+            self.assertEqual(self.index.nearest((37.62, 55.75)), [])
+            self.geocode_restaurant()
+            self.assertEqual(self.index.nearest((37.62, 55.75)), [])
+
+    def test_rebuilds_expired_index_from_database(self):
+        with override_settings(RESTAURANT_INDEX_MAX_AGE=0):
+            self.assertEqual(self.index.nearest((37.62, 55.75)), [])
+            self.geocode_restaurant()
+            [(restaurant_id, _)] = self.index.nearest((37.62, 55.75))
+
+        self.assertEqual(restaurant_id, self.restaurant.id)
+
+
+class RestaurantGeocodingTest(TestCase):
+    def test_address_is_enqueued_only_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Restaurant.objects.create(name='Star Burger', address='Москва')
+
+        self.assertFalse(GeocodeTask.objects.exists())
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(
+            list(GeocodeTask.objects.values_list('address', flat=True)),
+            ['Москва']
+        )
+
+
+class RegisterOrderTest(TestCase):
+    def setUp(self):
+        category = ProductCategory.objects.create(name='Бургеры')
+        self.products = [
+            Product.objects.create(name=f'Бургер {number}', category=category, price=100)
+            for number in range(10)
+        ]
+
+    def register_order(self, products_count):
+        response = self.client.post(
+            '/api/order/',
+            {
+                'address': 'Москва, Красная площадь, 1',
+                'firstname': 'Иван',
+                'lastname': 'Иванов',
+                'phonenumber': '+79991234567',
+                'products': [
+                    {'product': product.id, 'quantity': 1}
+                    for product in self.products[:products_count]
+                ],
+            },
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_depend_on_products_count(self):
+        with CaptureQueriesContext(connection) as single_product_queries:
+            self.register_order(1)
+
+        with self.assertNumQueries(len(single_product_queries)):
+            self.register_order(len(self.products))
+
+        self.assertEqual(
+            Order.objects.order_by('-id').first().elements.count(),
+            len(self.products)
+        )
+
+
+class IdempotentOrderTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+
+    def get_order_content(self, quantity=1):
+        return {
+            'address': 'Москва, Красная площадь, 1',
+            'firstname': 'Иван',
+            'lastname': 'Иванов',
+            'phonenumber': '+79991234567',
+            'products': [{'product': self.product.id, 'quantity': quantity}],
+        }
+
+    def register_order(self, order_content, key='order-1'):
+        return self.client.post(
+            '/api/order/',
+            order_content,
+            content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_repeated_key_replays_stored_response(self):
+        first_response = self.register_order(self.get_order_content())
+        response = self.register_order(self.get_order_content())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.json(), first_response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_repeated_key_with_other_order_is_rejected(self):
+        self.register_order(self.get_order_content())
+        response = self.register_order(self.get_order_content(quantity=2))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_key_creates_new_order(self):
+        self.register_order(self.get_order_content())
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(seconds=settings.ORDER_IDEMPOTENCY_TTL + 1)
+        )
+
+        response = self.register_order(self.get_order_content())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(
+            IdempotencyKey.objects.get().order_id,
+            Order.objects.order_by('-id').first().id
+        )
+
+    def test_concurrent_request_with_same_key_replays_its_response(self):
+        order_content = self.get_order_content()
+        IdempotencyKey.objects.create(
+            key='order-1',
+            fingerprint=IdempotencyKey.get_fingerprint(order_content),
+            order_id=None,
+            response={'address': 'Москва, Красная площадь, 1'},
+        )
+        find = IdempotencyKey.find
+        # Первая проверка ключа не видит запись параллельного запроса,
+        # и сохранение своей записи падает на уникальности ключа.
+        with patch.object(IdempotencyKey, 'find', side_effect=[None, find('order-1')]):
+            response = self.register_order(order_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(response.json(), {'address': 'Москва, Красная площадь, 1'})
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(ORDER_INTAKE_ASYNC=True)
+class OrderIntakeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+
+    def register_order(self):
+        response = self.client.post(
+            '/api/order/',
+            {
+                'address': 'Москва, Красная площадь, 1',
+                'firstname': 'Иван',
+                'lastname': 'Иванов',
+                'phonenumber': '+79991234567',
+                'products': [{'product': self.product.id, 'quantity': 2}],
+            },
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def drain_order_intake(self):
+        call_command('drain_order_intake', '--once', stdout=StringIO())
+
+    def test_order_is_queued_with_tracking_payload(self):
+        intake_status = self.register_order()
+
+        intake = OrderIntake.objects.get()
+        self.assertEqual(intake_status['tracking_id'], str(intake.tracking_id))
+        self.assertEqual(intake_status['status'], OrderIntake.QUEUED)
+        self.assertIsNone(intake_status['order_id'])
+        self.assertFalse(Order.objects.exists())
+
+        response = self.client.get(intake_status['status_url'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), intake_status)
+
+    def test_drain_creates_order_with_captured_price(self):
+        intake_status = self.register_order()
+        Product.objects.filter(pk=self.product.pk).update(price=150)
+
+        self.drain_order_intake()
+
+        order = Order.objects.get()
+        [element] = order.elements.all()
+        self.assertEqual((element.product, element.quantity, element.price), (self.product, 2, 100))
+        self.assertEqual(order.total_cost, 200)
+
+        response = self.client.get(intake_status['status_url'])
+        self.assertEqual(response.json()['status'], OrderIntake.PROCESSED)
+        self.assertEqual(response.json()['order_id'], order.id)
+
+    def test_intake_with_deleted_product_fails(self):
+        self.register_order()
+        product_id = self.product.id
+        self.product.delete()
+
+        self.drain_order_intake()
+
+        intake = OrderIntake.objects.get()
+        self.assertEqual(intake.status, OrderIntake.FAILED)
+        self.assertEqual(intake.error, f'Товары больше не продаются: {product_id}')
+        self.assertIsNotNone(intake.processed_at)
+        self.assertFalse(Order.objects.exists())
+
+
+class VersionedPayloadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_payload_costs_one_cache_read(self):
+        payload = products_payload.get()
+
+        with patch.object(cache, 'get', wraps=cache.get) as cache_get, \
+                patch.object(cache, 'add', wraps=cache.add) as cache_add:
+            self.assertEqual(products_payload.get(), payload)
+
+        self.assertEqual(cache_get.call_count, 1)
+        cache_add.assert_not_called()
+
+    @override_settings(PAYLOAD_VERSION_TTL=60)
+    def test_stale_payload_expires_without_invalidation(self):
+        product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100,
+            image='burger.jpg'
+        )
+        RestaurantMenuItem.objects.create(
+            restaurant=Restaurant.objects.create(name='Star Burger', address='Москва'),
+            product=product
+        )
+        products_payload.get()
+        # Так цену меняет другой воркер: версия в его кэше в памяти
+        # процесса сюда не доходит.
+        Product.objects.filter(pk=product.pk).update(price=150)
+
+        self.assertIn(b'"price":"100.00"', products_payload.get().bodies[None])
+        expired_at = time.time() + 61
+        with patch.object(time, 'time', return_value=expired_at):
+            self.assertIn(b'"price":"150.00"', products_payload.get().bodies[None])
+
+
+class ProductListApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100,
+            image='burger.jpg'
+        )
+        RestaurantMenuItem.objects.create(
+            restaurant=Restaurant.objects.create(name='Star Burger', address='Москва'),
+            product=self.product
+        )
+
+    def get_products(self, **headers):
+        return self.client.get('/api/products/', **headers)
+
+    def test_unchanged_catalog_is_not_sent_again(self):
+        response = self.get_products()
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            self.get_products(HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304
+        )
+        self.assertEqual(
+            self.get_products(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+            304
+        )
+
+    def test_saved_product_invalidates_catalog(self):
+        response = self.get_products()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 150
+            self.product.save()
+
+        changed_response = self.get_products(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed_response.status_code, 200)
+        self.assertNotEqual(changed_response['ETag'], response['ETag'])
+        [product] = changed_response.json()
+        self.assertEqual(product['price'], '150.00')
+
+    def test_encoding_follows_accept_encoding(self):
+        body = self.get_products().content
+        decompressors = {'br': brotli.decompress, 'gzip': gzip.decompress}
+
+        for accept_encoding, encoding in [
+            ('gzip, deflate, br', 'br'),
+            ('gzip, br;q=0', 'gzip'),
+            ('*', 'br'),
+            ('identity', None),
+        ]:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.get_products(HTTP_ACCEPT_ENCODING=accept_encoding)
+
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                if encoding:
+                    self.assertEqual(decompressors[encoding](response.content), body)
+                else:
+                    self.assertEqual(response.content, body)
+
+    def test_etag_depends_on_encoding(self):
+        plain_etag = self.get_products()['ETag']
+        gzip_etag = self.get_products(HTTP_ACCEPT_ENCODING='gzip')['ETag']
+
+        self.assertNotEqual(plain_etag, gzip_etag)
+        self.assertEqual(
+            self.get_products(HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=gzip_etag).status_code,
+            200
+        )
+
+
+class OrderTotalCostTest(TestCase):
+    def setUp(self):
+        product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+        self.order = Order.objects.create(
+            address='Москва',
+            firstname='Иван',
+            lastname='Иванов',
+            phonenumber='+79991234567'
+        )
+        self.elements = [
+            OrderElement.objects.create(
+                order=self.order,
+                product=product,
+                quantity=quantity,
+                price=product.price
+            )
+            for quantity in (1, 2, 3)
+        ]
+
+    def test_element_changes_refresh_total_cost(self):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_cost, 600)
+
+        self.elements[0].delete()
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_cost, 500)
+
+    def test_order_deletion_skips_total_cost_refresh(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.order.delete()
+
+        self.assertFalse([
+            query for query in queries
+            if query['sql'].startswith('UPDATE "foodcartapp_order"')
+        ])
+        self.assertFalse(OrderElement.objects.exists())
+
+
+class OpenOrdersCountTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+        self.restaurants = [
+            Restaurant.objects.create(name=name, address=f'Москва, {name}')
+            for name in ('Первый', 'Второй')
+        ]
+        self.order = Order.objects.create(
+            address='Москва',
+            firstname='Иван',
+            lastname='Иванов',
+            phonenumber='+79991234567'
+        )
+        OrderElement.objects.create(order=self.order, product=self.product, quantity=1, price=100)
+
+    def get_counts(self):
+        return [
+            Restaurant.objects.get(pk=restaurant.pk).open_orders_count
+            for restaurant in self.restaurants
+        ]
+
+    def test_count_follows_status_and_restaurant(self):
+        first, second = self.restaurants
+
+        self.order.status = Order.GOING_TO
+        self.order.serving_restaurant = first
+        self.order.save()
+        self.assertEqual(self.get_counts(), [1, 0])
+
+        self.order.serving_restaurant = second
+        self.order.save()
+        self.assertEqual(self.get_counts(), [0, 1])
+
+        self.order.status = Order.DELIVERED
+        self.order.save()
+        self.assertEqual(self.get_counts(), [0, 0])
+
+    def test_deleted_order_is_uncounted(self):
+        self.order.status = Order.GOING_TO
+        self.order.serving_restaurant = self.restaurants[0]
+        self.order.save()
+
+        self.order.delete()
+
+        self.assertEqual(self.get_counts(), [0, 0])
+
+    def test_admin_assignment_is_counted(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        [element] = self.order.elements.all()
+
+        response = self.client.post(
+            reverse('admin:foodcartapp_order_change', args=[self.order.id]),
+            {
+                'address': self.order.address,
+                'firstname': self.order.firstname,
+                'lastname': self.order.lastname,
+                'phonenumber': str(self.order.phonenumber),
+                'status': Order.UNPROCESSED,
+                'method_payment': 'C',
+                'serving_restaurant': self.restaurants[0].id,
+                'elements-TOTAL_FORMS': 1,
+                'elements-INITIAL_FORMS': 1,
+                'elements-0-id': element.id,
+                'elements-0-order': self.order.id,
+                'elements-0-product': self.product.id,
+                'elements-0-quantity': 1,
+                'elements-0-price': 100,
+            }
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.GOING_TO)
+        self.assertEqual(self.get_counts(), [1, 0])
+
+
+class RunBenchmarkCommandTest(SimpleTestCase):
+    def test_runs_without_touching_working_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database_path = os.path.join(directory, 'db.sqlite3')
+            cache_path = os.path.join(directory, 'cache')
+            output_path = os.path.join(directory, 'benchmark.json')
+
+            working_cache = FileBasedCache(cache_path, {})
+            working_cache.set('working-key', 'working-value')
+
+            result = subprocess.run(
+                [
+                    sys.executable, 'manage.py', 'run_benchmark',
+                    '--sizes', '2x5x10',
+                    '--requests', '2',
+                    '--warmup', '0',
+                    '--output', output_path,
+                ],
+                cwd=settings.BASE_DIR,
+                env={
+                    **os.environ,
+                    'DEBUG': 'false',
+                    'DATABASE_URL': f'sqlite:///{database_path}',
+                    'CACHE_URL': f'file://{cache_path}',
+                },
+                capture_output=True,
+                text=True,
+                timeout=120,
+            )
+
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(output_path) as output:
+                scenarios = {
+                    benchmark['scenario'] for benchmark in json.load(output)['results']
+                }
+            self.assertEqual(
+                scenarios,
+                {'product_list_api', 'register_order', 'view_orders'}
+            )
+            self.assertFalse(os.path.exists(database_path))
+            self.assertEqual(working_cache.get('working-key'), 'working-value')
+
+
+class ImportOrdersTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+        admin = User.objects.create_user('admin', password='secret', is_staff=True)
+        self.client.force_login(admin)
+
+    def get_order_row(self, product_id):
+        return {
+            'address': 'Москва, Красная площадь, 1',
+            'firstname': 'Иван',
+            'lastname': 'Иванов',
+            'phonenumber': '+79991234567',
+            'products': [{'product': product_id, 'quantity': 2}],
+        }
+
+    def import_orders(self, rows):
+        response = self.client.post(
+            '/api/orders/import/',
+            rows,
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_product_id_given_as_string(self):
+        result = self.import_orders([self.get_order_row(str(self.product.id))])
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['created'], 1)
+
+    def test_ids_of_deleted_orders_are_not_reused(self):
+        first_result = self.import_orders([self.get_order_row(self.product.id)] * 3)
+        last_order_id = first_result['order_ids'][-1]
+        Order.objects.filter(pk=last_order_id).delete()
+
+        result = self.import_orders([self.get_order_row(self.product.id)] * 2)
+
+        self.assertTrue(all(order_id > last_order_id for order_id in result['order_ids']))
+        for order in Order.objects.filter(pk__in=result['order_ids']):
+            self.assertEqual(order.total_cost, 200)
+            self.assertEqual(order.elements.count(), 1)
+
+    def test_failed_chunk_is_reported_with_created_ids(self):
+        create_with_elements = OrderQuerySet.create_with_elements
+        calls = []
+
+        def fail_second_chunk(queryset, orders_elements, *args, **kwargs):
+            calls.append(len(orders_elements))
+            if len(calls) == 2:
+                raise IntegrityError('UNIQUE constraint failed: foodcartapp_order.id')
+            return create_with_elements(queryset, orders_elements, *args, **kwargs)
+
+        with patch.object(views, 'IMPORT_CHUNK_SIZE', 2), \
+                patch.object(OrderQuerySet, 'create_with_elements', fail_second_chunk):
+            result = self.import_orders([self.get_order_row(self.product.id)] * 5)
+
+        self.assertEqual(result['created'], 3)
+        self.assertCountEqual(
+            result['order_ids'],
+            Order.objects.values_list('id', flat=True)
+        )
+        self.assertEqual([error['row'] for error in result['errors']], [2, 3])
+
+
+class AssignRestaurantsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        coordinates_cache._entries.clear()
+        product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+        for address, longitude in [('Москва, ресторан', 37.60), ('Москва, 1', 37.61), ('Москва, 2', 37.62)]:
+            Location.objects.create(
+                address=address,
+                longitude=longitude,
+                latitude=55.75,
+                received_at=timezone.now()
+            )
+        self.restaurant = Restaurant.objects.create(name='Star Burger', address='Москва, ресторан')
+        RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=product)
+
+        self.orders = []
+        for address in ('Москва, 1', 'Москва, 2'):
+            order = Order.objects.create(
+                address=address,
+                firstname='Иван',
+                lastname='Иванов',
+                phonenumber='+79991234567'
+            )
+            OrderElement.objects.create(order=order, product=product, quantity=1, price=100)
+            self.orders.append(order)
+
+    def test_skips_orders_processed_during_planning(self):
+        taken_order = self.orders[0]
+        plan_assignment = assignment.plan_assignment
+
+        def plan_and_take_order(*args, **kwargs):
+            planned = plan_assignment(*args, **kwargs)
+            Order.objects.filter(pk=taken_order.pk).update(status=Order.DELIVERED)
+            return planned
+
+        with patch.object(assignment, 'plan_assignment', plan_and_take_order), \
+                self.captureOnCommitCallbacks(execute=True):
+            result = assignment.assign_restaurants()
+
+        self.assertEqual(result.restaurant_ids, {self.orders[1].id: self.restaurant.id})
+        self.assertEqual(
+            set(OrderEvent.objects.values_list('order_id', flat=True)),
+            {self.orders[1].id}
+        )
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.open_orders_count, 1)
+
+    def test_respects_capacity(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(open_orders_count=1)
+
+        result = assignment.assign_restaurants(capacity=2)
+
+        self.assertEqual(len(result.restaurant_ids), 1)
+        self.assertEqual(len(result.unassigned_ids), 1)
+
+
+class ArchiveOrdersTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+        self.order = Order.objects.create(
+            address='Москва',
+            firstname='Иван',
+            lastname='Иванов',
+            phonenumber='+79991234567',
+            status=Order.COMPLETED
+        )
+        OrderElement.objects.create(order=self.order, product=self.product, quantity=2, price=100)
+        Order.objects.filter(pk=self.order.pk).update(
+            created_at=timezone.now() - timedelta(days=60)
+        )
+
+    def test_moves_orders_with_elements(self):
+        self.assertEqual(list(archive_orders(days=30)), [1])
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderElement.objects.exists())
+        with self.assertNumQueries(2):
+            [archived_order] = ArchivedOrder.objects.with_elements()
+            self.assertEqual(
+                [(element.product.name, element.quantity)
+                 for element in archived_order.elements.all()],
+                [('Бургер', 2)]
+            )
+        self.assertEqual(archived_order.id, self.order.id)
+        self.assertEqual(archived_order.total_cost, 200)
+
+    def test_conflict_with_archive_keeps_live_order(self):
+        ArchivedOrder.objects.create(
+            id=self.order.id,
+            address='Другой адрес',
+            firstname='Пётр',
+            lastname='Петров',
+            phonenumber='+79997654321',
+            method_payment=self.order.method_payment,
+            created_at=timezone.now(),
+            archived_at=timezone.now()
+        )
+
+        with self.assertRaises(IntegrityError):
+            archive_chunk(get_archivable_orders(days=30), chunk_size=10)
+
+        self.assertTrue(Order.objects.filter(pk=self.order.pk).exists())
+        self.assertEqual(self.order.elements.count(), 1)
+        self.assertEqual(ArchivedOrder.objects.get().address, 'Другой адрес')
+
+    def test_admin_redirects_archived_order_to_archive(self):
+        admin = User.objects.create_superuser('admin', password='secret')
+        self.client.force_login(admin)
+        list(archive_orders(days=30))
+
+        response = self.client.get(
+            reverse('admin:foodcartapp_order_change', args=[self.order.id])
+        )
+
+        self.assertRedirects(
+            response,
+            reverse('admin:foodcartapp_archivedorder_change', args=[self.order.id])
+        )
+
+
+class DeliveryRoutesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        coordinates_cache._entries.clear()
+        for address, longitude in [
+            ('Москва, ресторан', 37.60),
+            ('Москва, 3', 37.63),
+            ('Москва, 1', 37.61),
+            ('Москва, 2', 37.62),
+        ]:
+            Location.objects.create(
+                address=address,
+                longitude=longitude,
+                latitude=55.75,
+                received_at=timezone.now()
+            )
+
+    def create_order(self, restaurant, address):
+        return Order.objects.create(
+            address=address,
+            firstname='Иван',
+            lastname='Иванов',
+            phonenumber='+79991234567',
+            status=Order.DELIVERED,
+            serving_restaurant=restaurant
+        )
+
+    def test_batches_orders_and_skips_addresses_without_coordinates(self):
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Москва, ресторан')
+        far, near, middle = [
+            self.create_order(restaurant, address)
+            for address in ('Москва, 3', 'Москва, 1', 'Москва, 2')
+        ]
+        unknown = self.create_order(restaurant, 'Москва, неизвестный адрес')
+
+        [routes] = get_delivery_routes(batch_size=2)
+
+        self.assertEqual(routes.restaurant, restaurant)
+        self.assertEqual(
+            [batch.orders for batch in routes.batches],
+            [[near, middle], [far]]
+        )
+        self.assertEqual(routes.unrouted_orders, [unknown])
+
+    def test_restaurant_without_coordinates_is_not_routed(self):
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Москва, без координат')
+        order = self.create_order(restaurant, 'Москва, 1')
+
+        [routes] = get_delivery_routes(batch_size=2)
+
+        self.assertEqual(routes.batches, [])
+        self.assertEqual(routes.unrouted_orders, [order])
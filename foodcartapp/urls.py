@@ -1,6 +1,7 @@
 from django.urls import path
 
-from .views import banners_list_api, product_list_api, register_order
+from .views import (banners_list_api, import_orders, order_intake_status,
+                    product_list_api, register_order)
 
 app_name = "foodcartapp"
 
@@ -8,4 +9,10 @@ urlpatterns = [
     path('products/', product_list_api),
     path('banners/', banners_list_api),
     path('order/', register_order),
+    path('orders/import/', import_orders),
+    path(
+        'order/intake/<uuid:tracking_id>/',
+        order_intake_status,
+        name='order_intake_status'
+    ),
 ]
@@ -1,17 +1,32 @@
 import json
 
-from django.db import transaction
-from django.http import JsonResponse
-from django.templatetags.static import static
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from geolocation.models import GeocodeTask
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import (api_view, parser_classes,
+                                       permission_classes)
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from rest_framework.serializers import ListField, ModelSerializer
+from rest_framework.serializers import (IntegerField, ListField,
+                                        ModelSerializer,
+                                        PrimaryKeyRelatedField,
+                                        ValidationError)
+from star_burger.metrics import query_budget
 
-from .models import Order, OrderElement, Product
+from .models import (IdempotencyKey, Order, OrderElement, OrderIntake,
+                     Product)
+from .parsers import NDJSONParser
+from .payloads import (banners_payload, payload_response, product_prices,
+                       products_payload)
 
 
 class OrderElementSerializer(ModelSerializer):
+    product = IntegerField(min_value=1)
+
     class Meta:
         model = OrderElement
         fields = [
@@ -36,96 +51,333 @@ class OrderSerializer(ModelSerializer):
             'products',
         ]
 
+    def validate_products(self, products):
+        """Подставляет в элементы заказа продукты, загруженные одним запросом.
 
-def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
+        Если в контексте передан catalog, продукты берутся из него: так
+        пачка заказов проверяется с одним запросом на всех.
+        """
+        catalog = self.context.get('catalog')
+        if catalog is None:
+            catalog = Product.objects.in_bulk(
+                {element['product'] for element in products}
+            )
+        does_not_exist = PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ]
+
+        errors = {}
+        for index, element in enumerate(products):
+            product = catalog.get(element['product'])
+
+            if product:
+                element['product'] = product
+            else:
+                errors[index] = {
+                    'product': [does_not_exist.format(pk_value=element['product'])]
+                }
+
+        if errors:
+            raise ValidationError(errors)
+
+        return products
+
+
+class OrderIntakeSerializer(OrderSerializer):
+    """Проверяет заказ по закэшированным ценам, не обращаясь к базе."""
+
+    def validate_products(self, products):
+        prices = product_prices.get()
+        does_not_exist = PrimaryKeyRelatedField.default_error_messages[
+            'does_not_exist'
+        ]
+
+        errors = {}
+        for index, element in enumerate(products):
+            price = prices.get(element['product'])
+
+            if price is not None:
+                element['price'] = price
+            else:
+                errors[index] = {
+                    'product': [does_not_exist.format(pk_value=element['product'])]
+                }
+
+        if errors:
+            raise ValidationError(errors)
+
+        return products
+
+    def get_intake_payload(self):
+        """Данные заказа для очереди приёма."""
+        return {
+            'address': self.validated_data['address'],
+            'firstname': self.validated_data['firstname'],
+            'lastname': self.validated_data['lastname'],
+            'phonenumber': str(self.validated_data['phonenumber']),
+            'products': self.validated_data['products'],
         }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
 
 
+@query_budget(2)
+def banners_list_api(request):
+    return payload_response(request, banners_payload.get())
+
+
+@query_budget(2)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    return payload_response(request, products_payload.get())
+
 
+def replay_order_response(idempotency_record, fingerprint):
+    """Ответ на повтор запроса с уже использованным ключом идемпотентности."""
+    if idempotency_record.fingerprint != fingerprint:
+        return Response(
+            {'detail': 'Ключ идемпотентности уже использован с другим заказом.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
 
+    return Response(
+        idempotency_record.response,
+        status=idempotency_record.status_code,
+        headers={'Idempotent-Replayed': 'true'}
+    )
+
+
+def create_order(validated_data):
+    """Создаёт заказ с элементами. Вызывается внутри транзакции."""
+    products = validated_data['products']
+
+    order = Order.objects.create(
+        address=validated_data['address'],
+        firstname=validated_data['firstname'],
+        lastname=validated_data['lastname'],
+        phonenumber=validated_data['phonenumber'],
+        total_cost=sum(
+            product_content['quantity'] * product_content['product'].price
+            for product_content in products
+        ),
+    )
+
+    order_elements = []
+
+    for product_content in products:
+        product = product_content['product']
+
+        order_elements.append(
+            OrderElement(
+                order=order,
+                product=product,
+                quantity=product_content['quantity'],
+                price=product.price,
+            )
+        )
+
+    OrderElement.objects.bulk_create(order_elements)
+
+    transaction.on_commit(lambda: GeocodeTask.enqueue([order.address]))
+
+    return order
+
+
+@query_budget(14)
 @api_view(['POST'])
 def register_order(request):
-    """Оформление заказа."""
+    """Оформление заказа.
+
+    Если клиент передал заголовок Idempotency-Key, повтор запроса с тем же
+    ключом возвращает ответ на первый запрос и не создаёт новый заказ.
+
+    При включённой настройке ORDER_INTAKE_ASYNC заказ проверяется по
+    закэшированным ценам и ставится в очередь приёма, а клиент сразу
+    получает 202 с номером для отслеживания.
+    """
     order_content = request.data
 
-    serializer = OrderSerializer(data=order_content)
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key is not None:
+        if not 0 < len(idempotency_key) <= IdempotencyKey.KEY_MAX_LENGTH:
+            return Response(
+                {'detail': 'Ключ идемпотентности должен быть длиной '
+                           f'от 1 до {IdempotencyKey.KEY_MAX_LENGTH} символов.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = IdempotencyKey.get_fingerprint(order_content)
+        idempotency_record = IdempotencyKey.find(idempotency_key)
+        if idempotency_record:
+            return replay_order_response(idempotency_record, fingerprint)
+
+    intake_async = settings.ORDER_INTAKE_ASYNC
+    serializer_class = OrderIntakeSerializer if intake_async else OrderSerializer
+    serializer = serializer_class(data=order_content)
     serializer.is_valid(raise_exception=True)
 
-    products = order_content.get('products')
+    products = serializer.validated_data['products']
 
     if not products:
         error_content = {
             'products': ['Этот список не может быть пустым.']}
         return Response(error_content, status=status.HTTP_400_BAD_REQUEST)
 
-    with transaction.atomic():
-        order = Order.objects.create(
-            address=order_content.get('address'),
-            firstname=order_content.get('firstname'),
-            lastname=order_content.get('lastname'),
-            phonenumber=order_content.get('phonenumber'),
+    try:
+        with transaction.atomic():
+            if intake_async:
+                intake = OrderIntake.objects.create(
+                    payload=serializer.get_intake_payload()
+                )
+                order_id = None
+                response_status = status.HTTP_202_ACCEPTED
+                order_response = get_intake_status(intake)
+            else:
+                order = create_order(serializer.validated_data)
+                order_id = order.id
+                response_status = status.HTTP_200_OK
+                order_response = OrderSerializer(order).data
+
+            if idempotency_key is not None:
+                IdempotencyKey.remember(
+                    idempotency_key,
+                    fingerprint,
+                    order_id,
+                    order_response,
+                    response_status
+                )
+    except IntegrityError:
+        # Параллельный запрос с тем же ключом успел сохранить свой заказ,
+        # а этот откатился целиком.
+        if idempotency_key is None:
+            raise
+        idempotency_record = IdempotencyKey.find(idempotency_key)
+        if not idempotency_record:
+            raise
+        return replay_order_response(idempotency_record, fingerprint)
+
+    return Response(order_response, status=response_status)
+
+
+def get_intake_status(intake):
+    return {
+        'tracking_id': str(intake.tracking_id),
+        'status': intake.status,
+        'order_id': intake.order_id,
+        'error': intake.error,
+        'status_url': reverse(
+            'foodcartapp:order_intake_status',
+            args=(intake.tracking_id,)
+        ),
+    }
+
+
+@api_view(['GET'])
+def order_intake_status(request, tracking_id):
+    """Состояние заказа, принятого в очередь приёма."""
+    intake = get_object_or_404(OrderIntake, tracking_id=tracking_id)
+    return Response(get_intake_status(intake))
+
+
+# Сколько заказов импорта записывать в одной транзакции.
+IMPORT_CHUNK_SIZE = 1000
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([JSONParser, NDJSONParser])
+def import_orders(request):
+    """Импорт пачки заказов: JSON-массив или NDJSON, по заказу на строку.
+
+    Все заказы проверяются вместе, продукты загружаются одним запросом,
+    а заказы с элементами записываются через bulk_create частями. Заказы
+    с ошибками пропускаются и перечисляются в ответе с номером строки.
+    Каждая часть записывается в своей транзакции: если запись части
+    не удалась, её строки тоже попадают в ошибки, а id заказов из уже
+    записанных частей всё равно возвращаются, чтобы повтор импорта
+    не создал их второй раз.
+    """
+    rows = request.data
+    if not isinstance(rows, list):
+        return Response(
+            {'detail': 'Ожидается список заказов.'},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-        order_elements = []
+    # id продуктов приводятся тем же полем, что и при проверке заказа,
+    # чтобы строка "5" нашлась в каталоге так же, как число 5.
+    product_field = OrderElementSerializer().fields['product']
+    product_ids = set()
+    for row in rows:
+        products = row.get('products') if isinstance(row, dict) else None
+        if not isinstance(products, list):
+            continue
+        for element in products:
+            if not isinstance(element, dict):
+                continue
+            try:
+                product_ids.add(product_field.run_validation(element.get('product')))
+            except ValidationError:
+                continue
+    catalog = Product.objects.in_bulk(product_ids)
 
-        for product_content in products:
-            product = Product.objects.get(pk=product_content.get('product'))
+    # Один сериализатор на все строки, как в ListSerializer: поля
+    # собираются один раз, а не для каждого заказа.
+    serializer = OrderSerializer(context={'catalog': catalog})
 
-            order_elements.append(
-                OrderElement(
-                    order=order,
-                    product=product,
-                    quantity=product_content.get('quantity'),
-                    price=product.price,
-                )
+    orders_elements = []
+    order_row_numbers = []
+    errors = []
+    for row_number, row in enumerate(rows):
+        try:
+            validated_data = serializer.run_validation(row)
+        except ValidationError as error:
+            errors.append({'row': row_number, 'errors': error.detail})
+            continue
+
+        products = validated_data['products']
+        if not products:
+            errors.append({
+                'row': row_number,
+                'errors': {'products': ['Этот список не может быть пустым.']},
+            })
+            continue
+
+        order = Order(
+            address=validated_data['address'],
+            firstname=validated_data['firstname'],
+            lastname=validated_data['lastname'],
+            phonenumber=validated_data['phonenumber'],
+        )
+        elements = [
+            OrderElement(
+                product=product_content['product'],
+                quantity=product_content['quantity'],
+                price=product_content['product'].price,
             )
+            for product_content in products
+        ]
+        orders_elements.append((order, elements))
+        order_row_numbers.append(row_number)
 
-        OrderElement.objects.bulk_create(order_elements)
+    order_ids = []
+    for chunk_start in range(0, len(orders_elements), IMPORT_CHUNK_SIZE):
+        chunk_end = chunk_start + IMPORT_CHUNK_SIZE
+        try:
+            with transaction.atomic():
+                orders = Order.objects.create_with_elements(
+                    orders_elements[chunk_start:chunk_end]
+                )
+        except DatabaseError as error:
+            errors.extend(
+                {
+                    'row': row_number,
+                    'errors': {'non_field_errors': [f'Заказ не записан: {error}']},
+                }
+                for row_number in order_row_numbers[chunk_start:chunk_end]
+            )
+            continue
+        order_ids.extend(order.id for order in orders)
 
-    return Response(OrderSerializer(order).data)
+    return Response({
+        'created': len(order_ids),
+        'order_ids': order_ids,
+        'errors': errors,
+    })
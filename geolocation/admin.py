@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Location
+from .models import GeocodeTask, Location
+
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
@@ -11,3 +12,14 @@ class LocationAdmin(admin.ModelAdmin):
         'longitude',
         'received_at',
     ]
+
+
+@admin.register(GeocodeTask)
+class GeocodeTaskAdmin(admin.ModelAdmin):
+    readonly_fields = ('created_at',)
+    list_display = [
+        'address',
+        'attempts',
+        'created_at',
+        'claimed_until',
+    ]
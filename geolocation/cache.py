@@ -0,0 +1,101 @@
+import hashlib
+from collections import OrderedDict
+from datetime import timedelta
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+class CoordinatesCache:
+    """Кэш координат: LRU в памяти процесса поверх общего кэша Django.
+
+    Значение кэша — пара (координаты, дата получения). Запись считается
+    устаревшей, когда с даты получения прошло больше GEOCODE_CACHE_TTL.
+    Запись в памяти процесса перечитывается из общего кэша через
+    LRU_MAX_AGE секунд, чтобы исправленные в других процессах
+    координаты доходили и сюда.
+    """
+    KEY_TEMPLATE = 'geolocation:coordinates:{}'
+    LRU_MAX_AGE = 60
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def get_ttl():
+        return timedelta(seconds=settings.GEOCODE_CACHE_TTL)
+
+    def is_fresh(self, received_at):
+        return received_at + self.get_ttl() > timezone.now()
+
+    def get_many(self, addresses):
+        """Возвращает актуальные записи для найденных в кэше адресов."""
+        found = {}
+
+        remembered_after = monotonic() - self.LRU_MAX_AGE
+        with self._lock:
+            for address in addresses:
+                entry, remembered_at = self._entries.get(address, (None, None))
+                if entry and remembered_at > remembered_after and \
+                        self.is_fresh(entry[1]):
+                    self._entries.move_to_end(address)
+                    found[address] = entry
+
+        keys = {
+            self.make_key(address): address
+            for address in addresses if address not in found
+        }
+        if keys:
+            shared_entries = {
+                keys[key]: entry
+                for key, entry in cache.get_many(keys).items()
+                if self.is_fresh(entry[1])
+            }
+            self._remember(shared_entries)
+            found.update(shared_entries)
+
+        return found
+
+    def set_many(self, entries):
+        """Сохраняет записи {адрес: (координаты, дата получения)}."""
+        self._remember(entries)
+
+        now = timezone.now()
+        for address, (coords, received_at) in entries.items():
+            timeout = (received_at + self.get_ttl() - now).total_seconds()
+            if timeout > 0:
+                cache.set(
+                    self.make_key(address),
+                    (coords, received_at),
+                    timeout=timeout
+                )
+
+    def delete_many(self, addresses):
+        """Забывает координаты адресов, чтобы их перечитали из базы."""
+        with self._lock:
+            for address in addresses:
+                self._entries.pop(address, None)
+
+        cache.delete_many([self.make_key(address) for address in addresses])
+
+    def _remember(self, entries):
+        remembered_at = monotonic()
+        with self._lock:
+            for address, entry in entries.items():
+                self._entries[address] = (entry, remembered_at)
+                self._entries.move_to_end(address)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def make_key(self, address):
+        digest = hashlib.sha1(address.encode('utf-8')).hexdigest()
+        return self.KEY_TEMPLATE.format(digest)
+
+
+coordinates_cache = CoordinatesCache(settings.GEOCODE_LRU_SIZE)
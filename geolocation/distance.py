@@ -0,0 +1,43 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_radians_array(points):
+    """Переводит список координат (долгота, широта) в массив радиан.
+
+    Неизвестные координаты (None) превращаются в NaN.
+    """
+    array = np.full((len(points), 2), np.nan)
+    for index, point in enumerate(points):
+        if point:
+            array[index] = point
+    return np.radians(array)
+
+
+def distance_matrix(origins, destinations, mask=None):
+    """Возвращает матрицу расстояний в километрах между точками.
+
+    origins и destinations — списки координат (долгота, широта).
+    Все расстояния считаются одним проходом по формуле гаверсинусов.
+    Если передана булева матрица mask, расстояния для пар, где она
+    ложна, не считаются нужными и заменяются на NaN.
+    """
+    origins_rad = to_radians_array(origins)
+    destinations_rad = to_radians_array(destinations)
+
+    lon_from = origins_rad[:, 0, np.newaxis]
+    lat_from = origins_rad[:, 1, np.newaxis]
+    lon_to = destinations_rad[np.newaxis, :, 0]
+    lat_to = destinations_rad[np.newaxis, :, 1]
+
+    haversine = (
+        np.sin((lat_to - lat_from) / 2) ** 2 +
+        np.cos(lat_from) * np.cos(lat_to) * np.sin((lon_to - lon_from) / 2) ** 2
+    )
+    matrix = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+
+    if mask is not None:
+        matrix[~np.asarray(mask, dtype=bool)] = np.nan
+
+    return matrix
@@ -1,21 +1,27 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-import geolocation.models as geocode_models
+from geolocation.signals import geocoder_requested
 
+logger = logging.getLogger(__name__)
 
-def calculate_distance(address_from, address_to):
-    """Возвращает расстояние между двумя адресами."""
-    if distance := geocode_models.Location.calculate_distance(address_from, address_to):
-        return round(distance, 2)
+_geocoder = None
 
 
-def fetch_coordinates_from_api(apikey, address):
+def fetch_coordinates_from_api(apikey, address, session=requests, timeout=None):
     base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
+    response = session.get(base_url, params={
         "geocode": address,
         "apikey": apikey,
         "format": "json",
-    })
+    }, timeout=timeout)
     response.raise_for_status()
     found_places = response.json(
     )['response']['GeoObjectCollection']['featureMember']
@@ -26,3 +32,100 @@ def fetch_coordinates_from_api(apikey, address):
     most_relevant = found_places[0]
     lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
     return lon, lat
+
+
+class YandexGeocoder:
+    """Геокодер Яндекса с пулом соединений и повторами запросов."""
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self):
+        self.apikey = settings.YANDEX_API_KEY
+        self.timeout = settings.GEOCODER_TIMEOUT
+
+        retry = Retry(
+            total=settings.GEOCODER_RETRIES,
+            backoff_factor=settings.GEOCODER_BACKOFF_FACTOR,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=['GET'],
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.GEOCODER_CONCURRENCY,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+
+    def fetch_coordinates(self, address):
+        """Возвращает координаты адреса в виде (долгота, широта)."""
+        return fetch_coordinates_from_api(
+            self.apikey,
+            address,
+            session=self.session,
+            timeout=self.timeout
+        )
+
+
+class StubGeocoder:
+    """Геокодер без обращения к сети для тестов и замеров.
+
+    Возвращает детерминированные координаты в окрестностях Москвы,
+    вычисленные по хэшу адреса.
+    """
+    CENTER = (37.6176, 55.7558)
+    SPREAD = 0.3
+
+    def fetch_coordinates(self, address):
+        """Возвращает координаты адреса в виде (долгота, широта)."""
+        digest = hashlib.sha1(address.encode('utf-8')).digest()
+        lon_shift, lat_shift = (
+            int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF,
+            int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF,
+        )
+        lon, lat = self.CENTER
+        return (
+            str(lon + (lon_shift - 0.5) * self.SPREAD),
+            str(lat + (lat_shift - 0.5) * self.SPREAD),
+        )
+
+
+def get_geocoder():
+    """Возвращает геокодер, указанный в настройке GEOCODER_BACKEND."""
+    global _geocoder
+
+    if _geocoder is None:
+        _geocoder = import_string(settings.GEOCODER_BACKEND)()
+
+    return _geocoder
+
+
+def fetch_coordinates_bulk(addresses):
+    """Геокодирует адреса параллельно.
+
+    Возвращает словарь {адрес: координаты или None}. Адреса, которые не
+    удалось геокодировать из-за ошибки, в словарь не попадают.
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return {}
+
+    geocoder = get_geocoder()
+    coordinates = {}
+
+    geocoder_requested.send(sender=geocoder.__class__, addresses_count=len(addresses))
+
+    max_workers = min(settings.GEOCODER_CONCURRENCY, len(addresses))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(geocoder.fetch_coordinates, address): address
+            for address in addresses
+        }
+
+        for future in as_completed(futures):
+            address = futures[future]
+            try:
+                coordinates[address] = future.result()
+            except (requests.RequestException, KeyError, ValueError):
+                logger.exception('Не удалось геокодировать адрес %s', address)
+
+    return coordinates
@@ -0,0 +1,90 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from geolocation.cache import coordinates_cache
+from geolocation.models import GeocodeTask, Location
+
+
+class Command(BaseCommand):
+    help = 'Геокодирует адреса из очереди фонового геокодирования.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Сколько адресов геокодировать за один проход.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='После скольких неудачных попыток адрес пропускается.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь один раз и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            resolved = self.process_batch(
+                options['batch_size'],
+                options['max_attempts']
+            )
+
+            if resolved:
+                self.stdout.write(f'Геокодировано адресов: {resolved}')
+                continue
+
+            GeocodeTask.purge_dead(options['max_attempts'])
+
+            if options['once']:
+                return
+
+            time.sleep(options['interval'])
+
+    def process_batch(self, batch_size, max_attempts):
+        tasks = GeocodeTask.claim(batch_size, max_attempts)
+        if not tasks:
+            return 0
+
+        addresses = [task.address for task in tasks]
+        Location.get_coordinates_bulk(addresses)
+
+        # Устаревшая запись, которую не удалось обновить, остаётся
+        # в базе, поэтому решённой считается только свежая.
+        resolved = set(
+            Location.objects
+            .filter(
+                address__in=addresses,
+                received_at__gt=timezone.now() - coordinates_cache.get_ttl()
+            )
+            .values_list('address', flat=True)
+        )
+
+        task_ids = [task.pk for task in tasks]
+        with transaction.atomic():
+            GeocodeTask.objects.filter(
+                pk__in=task_ids,
+                address__in=resolved
+            ).delete()
+            (
+                GeocodeTask.objects
+                .filter(pk__in=task_ids)
+                .exclude(address__in=resolved)
+                .update(attempts=F('attempts') + 1, claimed_until=None)
+            )
+
+        return len(resolved)
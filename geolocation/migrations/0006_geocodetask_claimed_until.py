@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geolocation', '0005_geocodetask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodetask',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взят в работу до'),
+        ),
+    ]
@@ -1,9 +1,13 @@
-from django.conf import settings
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils import timezone
 from geopy.distance import distance, lonlat
 
-from .geocode_api import fetch_coordinates_from_api
+from .cache import coordinates_cache
+from .geocode_api import fetch_coordinates_bulk
+from .signals import locations_updated
 
 
 class Location(models.Model):
@@ -29,42 +33,208 @@ class Location(models.Model):
     )
 
     @staticmethod
-    def get_coordinates(address):
+    def get_coordinates(address, geocode_missing=True, enqueue_missing=True):
         """Возвращает координаты по адресу."""
-        yandex_api_key = settings.YANDEX_API_KEY
+        return Location.get_coordinates_bulk(
+            [address],
+            geocode_missing=geocode_missing,
+            enqueue_missing=enqueue_missing
+        )[address]
+
+    @staticmethod
+    def get_coordinates_bulk(addresses, geocode_missing=True, enqueue_missing=True):
+        """Возвращает координаты для набора адресов.
 
-        try:
-            coords = Location.objects.get(address=address)
-            coords = (coords.longitude, coords.latitude)
+        Адреса ищутся сначала в кэше, затем одним запросом в базе,
+        а оставшиеся геокодируются вместе. Если geocode_missing ложно,
+        к геокодеру запросы не отправляются: ненайденные и устаревшие
+        адреса ставятся в очередь фонового геокодирования, а для
+        устаревших возвращаются прежние координаты. С ложным
+        enqueue_missing в очередь они тоже не ставятся.
+        """
+        addresses = set(addresses)
+        entries = coordinates_cache.get_many(addresses)
 
-        except Location.DoesNotExist:
-            if coords := fetch_coordinates_from_api(yandex_api_key, address):
-                longitude, latitude = coords
+        locations = Location.objects.filter(
+            address__in=addresses - entries.keys()
+        )
+        stored_entries = {}
+        expired_locations = {}
 
-                if coords:
-                    Location.objects.create(
-                        address=address,
-                        longitude=longitude,
-                        latitude=latitude,
-                        received_at=timezone.now()
-                    )
+        for location in locations:
+            if coordinates_cache.is_fresh(location.received_at):
+                stored_entries[location.address] = (
+                    location.get_lonlat(),
+                    location.received_at
+                )
+            else:
+                expired_locations[location.address] = location
 
-        return coords
+        # В кэш кладутся только прочитанные из базы записи: найденные
+        # в кэше могли устареть, и запись продлила бы им жизнь.
+        coordinates_cache.set_many(stored_entries)
+        entries.update(stored_entries)
+
+        if missing_addresses := addresses - entries.keys():
+            if geocode_missing:
+                geocoded_entries = Location.geocode_addresses(
+                    missing_addresses,
+                    expired_locations
+                )
+                coordinates_cache.set_many(geocoded_entries)
+                entries.update(geocoded_entries)
+            else:
+                if enqueue_missing:
+                    GeocodeTask.enqueue(missing_addresses)
+                entries.update({
+                    address: (location.get_lonlat(), location.received_at)
+                    for address, location in expired_locations.items()
+                })
+
+        return {
+            address: entries[address][0] if address in entries else None
+            for address in addresses
+        }
 
     @staticmethod
-    def calculate_distance(address_from, address_to):
-        """Рассчитывает расстояние между двумя адресами."""
-        coords_from = Location.get_coordinates(address_from)
-        coords_to = Location.get_coordinates(address_to)
+    def geocode_addresses(addresses, expired_locations):
+        """Геокодирует адреса и сохраняет результат в базу.
+
+        Адреса, которые не удалось геокодировать из-за ошибки,
+        не сохраняются и в результат не попадают.
+        """
+        received_at = timezone.now()
+
+        new_locations = []
+        updated_locations = []
+        entries = {}
+
+        for address, coords in fetch_coordinates_bulk(addresses).items():
+            longitude, latitude = map(float, coords) if coords else (None, None)
+
+            location = expired_locations.get(address) or Location(address=address)
+            location.longitude = longitude
+            location.latitude = latitude
+            location.received_at = received_at
+
+            if location.pk:
+                updated_locations.append(location)
+            else:
+                new_locations.append(location)
+
+            entries[address] = (location.get_lonlat(), received_at)
+
+        Location.objects.bulk_create(new_locations, ignore_conflicts=True)
+        Location.objects.bulk_update(
+            updated_locations,
+            ['longitude', 'latitude', 'received_at']
+        )
 
+        locations_updated.send(
+            sender=Location,
+            coordinates={
+                address: coords for address, (coords, _) in entries.items()
+            }
+        )
+
+        return entries
+
+    @staticmethod
+    def get_distance(coords_from, coords_to):
+        """Рассчитывает расстояние между двумя точками."""
         if coords_from and coords_to:
             return distance(lonlat(*coords_from), lonlat(*coords_to)).km
 
         return None
 
+    def get_lonlat(self):
+        """Возвращает координаты в виде (долгота, широта)."""
+        if self.longitude is None or self.latitude is None:
+            return None
+
+        return self.longitude, self.latitude
+
     class Meta:
         verbose_name = 'Местоположение'
         verbose_name_plural = 'Местоположения'
 
     def __str__(self) -> str:
         return self.address
+
+
+class GeocodeTask(models.Model):
+    """Адрес в очереди фонового геокодирования.
+
+    Задача, исчерпавшая попытки, больше не берётся в работу и через
+    DEAD_TASK_TTL удаляется, чтобы следующая постановка адреса в очередь
+    снова дала ему попытки.
+    """
+    CLAIM_TIMEOUT = timedelta(minutes=5)
+    DEAD_TASK_TTL = timedelta(days=1)
+
+    address = models.CharField(
+        unique=True,
+        max_length=500,
+        verbose_name='Адрес'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Поставлен в очередь',
+        db_index=True,
+        auto_now_add=True
+    )
+    claimed_until = models.DateTimeField(
+        verbose_name='Взят в работу до',
+        blank=True,
+        null=True
+    )
+
+    @staticmethod
+    def enqueue(addresses):
+        """Ставит адреса в очередь, пропуская уже стоящие в ней."""
+        GeocodeTask.objects.bulk_create(
+            [GeocodeTask(address=address) for address in addresses if address],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def claim(batch_size, max_attempts):
+        """Берёт в работу задачи, которые не взял другой обработчик.
+
+        Задача остаётся за обработчиком CLAIM_TIMEOUT, поэтому блокировки
+        держатся только на время выбора задач, а не на время запросов
+        к геокодеру. Задачи упавшего обработчика вернутся в очередь
+        по истечении этого срока.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = list(
+                GeocodeTask.objects
+                .select_for_update(skip_locked=True)
+                .filter(attempts__lt=max_attempts)
+                .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+                .order_by('attempts', 'created_at')[:batch_size]
+            )
+            GeocodeTask.objects.filter(
+                pk__in=[task.pk for task in tasks]
+            ).update(claimed_until=now + GeocodeTask.CLAIM_TIMEOUT)
+
+        return tasks
+
+    @staticmethod
+    def purge_dead(max_attempts):
+        """Удаляет исчерпавшие попытки задачи старше DEAD_TASK_TTL."""
+        return GeocodeTask.objects.filter(
+            attempts__gte=max_attempts,
+            created_at__lt=timezone.now() - GeocodeTask.DEAD_TASK_TTL
+        ).delete()[0]
+
+    class Meta:
+        verbose_name = 'Задача геокодирования'
+        verbose_name_plural = 'Задачи геокодирования'
+
+    def __str__(self) -> str:
+        return self.address
@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import coordinates_cache
+from .models import Location
+from .signals import locations_updated
+
+
+@receiver(post_save, sender=Location)
+def announce_location_update(sender, instance, **kwargs):
+    """Сообщает об изменении координат адреса.
+
+    Закэшированные координаты адреса сбрасываются после коммита, иначе
+    исправление из админки не было бы видно до истечения кэша.
+    """
+    address = instance.address
+    transaction.on_commit(lambda: coordinates_cache.delete_many([address]))
+    locations_updated.send(
+        sender=Location,
+        coordinates={address: instance.get_lonlat()}
+    )
+
+
+@receiver(post_delete, sender=Location)
+def forget_deleted_location(sender, instance, **kwargs):
+    """Сбрасывает закэшированные координаты удалённого адреса."""
+    address = instance.address
+    transaction.on_commit(lambda: coordinates_cache.delete_many([address]))
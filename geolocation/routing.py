@@ -0,0 +1,85 @@
+"""Планирование маршрутов курьеров: ближайший сосед и улучшение 2-opt.
+
+Маршрут начинается в точке 0 (ресторан) и обходит точки доставки,
+возвращаться в ресторан не нужно. Все расстояния берутся из заранее
+посчитанной матрицы, поэтому на десятках точек решение занимает
+миллисекунды.
+"""
+from collections import namedtuple
+
+from .distance import distance_matrix
+
+Route = namedtuple('Route', 'stops distance')
+
+
+def route_length(matrix, route):
+    """Возвращает длину маршрута, начинающегося в точке 0."""
+    length = 0.0
+    previous = 0
+    for stop in route:
+        length += matrix[previous][stop]
+        previous = stop
+    return length
+
+
+def nearest_neighbour_route(matrix, stops):
+    """Строит маршрут, каждый раз переходя к ближайшей непосещённой точке."""
+    route = []
+    unvisited = set(stops)
+    current = 0
+    while unvisited:
+        current = min(unvisited, key=lambda stop: (matrix[current][stop], stop))
+        route.append(current)
+        unvisited.remove(current)
+    return route
+
+
+def improve_route(matrix, route):
+    """Улучшает маршрут разворотами отрезков (2-opt), пока это сокращает путь."""
+    route = [0, *route]
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 1):
+            for j in range(i + 1, len(route)):
+                before, first = route[i - 1], route[i]
+                last = route[j]
+                after = route[j + 1] if j + 1 < len(route) else None
+
+                removed = matrix[before][first]
+                added = matrix[before][last]
+                if after is not None:
+                    removed += matrix[last][after]
+                    added += matrix[first][after]
+
+                if added < removed - 1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route[1:]
+
+
+def plan_routes(depot, points, batch_size):
+    """Делит точки доставки на поездки не больше batch_size точек.
+
+    depot и points — координаты (долгота, широта). Сначала строится
+    один общий маршрут по всем точкам, затем он режется на поездки
+    подряд идущих точек, и каждая поездка улучшается отдельно.
+    Возвращает список Route с индексами points и длиной в километрах.
+    """
+    if not points:
+        return []
+
+    matrix = distance_matrix([depot, *points], [depot, *points]).tolist()
+    route = improve_route(
+        matrix,
+        nearest_neighbour_route(matrix, range(1, len(points) + 1))
+    )
+
+    routes = []
+    for start in range(0, len(route), batch_size):
+        batch = improve_route(matrix, route[start:start + batch_size])
+        routes.append(Route(
+            stops=[stop - 1 for stop in batch],
+            distance=round(route_length(matrix, batch), 2),
+        ))
+    return routes
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Отправляется, когда у адресов появились или изменились координаты.
+# Аргумент coordinates — словарь {адрес: (долгота, широта) или None}.
+locations_updated = Signal()
+
+# Отправляется перед обращением к внешнему геокодеру.
+# Аргумент addresses_count — сколько адресов будет геокодировано.
+geocoder_requested = Signal()
@@ -0,0 +1,137 @@
+import heapq
+import math
+from collections import defaultdict
+
+from .distance import EARTH_RADIUS_KM
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(point_from, point_to):
+    """Возвращает расстояние в километрах между точками (долгота, широта)."""
+    lon_from, lat_from = map(math.radians, point_from)
+    lon_to, lat_to = map(math.radians, point_to)
+
+    haversine = (
+        math.sin((lat_to - lat_from) / 2) ** 2 +
+        math.cos(lat_from) * math.cos(lat_to) *
+        math.sin((lon_to - lon_from) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(haversine, 1)))
+
+
+class GridIndex:
+    """Пространственный индекс точек по ячейкам сетки.
+
+    Точки раскладываются по квадратным в градусах ячейкам. Поиск
+    ближайших обходит ячейки кольцами вокруг точки запроса и
+    останавливается, как только следующее кольцо заведомо дальше
+    уже найденных точек или радиуса поиска.
+    """
+
+    def __init__(self, cell_size_km=2):
+        self.cell_size = cell_size_km / KM_PER_DEGREE
+        self._cells = defaultdict(dict)
+        self._points = {}
+        self._max_abs_latitude = 0
+        self._bounds = None
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def get_cell(self, point):
+        lon, lat = point
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+
+    def add(self, key, point):
+        """Добавляет точку или перемещает уже добавленную."""
+        self.remove(key)
+        if not point:
+            return
+
+        point = tuple(map(float, point))
+        self._points[key] = point
+        column, row = cell = self.get_cell(point)
+        self._cells[cell][key] = point
+        self._max_abs_latitude = max(self._max_abs_latitude, abs(point[1]))
+
+        if self._bounds is None:
+            self._bounds = (column, row, column, row)
+        else:
+            min_column, min_row, max_column, max_row = self._bounds
+            self._bounds = (
+                min(min_column, column),
+                min(min_row, row),
+                max(max_column, column),
+                max(max_row, row),
+            )
+
+    def remove(self, key):
+        """Убирает точку из индекса, если она там есть."""
+        point = self._points.pop(key, None)
+        if point is None:
+            return
+
+        cell = self.get_cell(point)
+        del self._cells[cell][key]
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    def nearest(self, point, k=1, radius_km=None, keys=None):
+        """Возвращает до k ближайших точек в виде [(ключ, км), ...].
+
+        radius_km ограничивает расстояние поиска, keys — множество
+        ключей, среди которых ищутся точки.
+        """
+        if not point or not self._points:
+            return []
+
+        point = tuple(map(float, point))
+        column, row = self.get_cell(point)
+
+        # Нижняя граница расстояния до точек за пределами пройденных колец.
+        max_abs_latitude = max(self._max_abs_latitude, abs(point[1]))
+        ring_width_km = self.cell_size * KM_PER_DEGREE * math.cos(
+            math.radians(min(max_abs_latitude + self.cell_size, 90))
+        )
+        min_column, min_row, max_column, max_row = self._bounds
+        max_ring = max(
+            column - min_column,
+            max_column - column,
+            row - min_row,
+            max_row - row,
+        )
+
+        found = []
+        for ring in range(max_ring + 1):
+            for cell in self._get_ring_cells(column, row, ring):
+                for key, cell_point in self._cells.get(cell, {}).items():
+                    if keys is not None and key not in keys:
+                        continue
+                    distance = haversine_km(point, cell_point)
+                    if radius_km is None or distance <= radius_km:
+                        found.append((distance, key))
+
+            reached_km = ring * ring_width_km
+            if radius_km is not None and reached_km > radius_km:
+                break
+            if len(found) >= k and heapq.nsmallest(k, found)[-1][0] <= reached_km:
+                break
+
+        return [(key, distance) for distance, key in heapq.nsmallest(k, found)]
+
+    @staticmethod
+    def _get_ring_cells(column, row, ring):
+        if ring == 0:
+            yield column, row
+            return
+
+        for shift in range(-ring, ring + 1):
+            yield column + shift, row - ring
+            yield column + shift, row + ring
+        for shift in range(-ring + 1, ring):
+            yield column - ring, row + shift
+            yield column + ring, row + shift
@@ -1,3 +1,137 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .cache import CoordinatesCache, coordinates_cache
+from .models import GeocodeTask, Location
+from .routing import improve_route, plan_routes, route_length
+
+
+class GeocodeAddressesCommandTest(TestCase):
+    address = 'Москва, Красная площадь, 1'
+
+    def setUp(self):
+        cache.clear()
+        coordinates_cache._entries.clear()
+        GeocodeTask.enqueue([self.address])
+
+    def run_command(self):
+        call_command('geocode_addresses', '--once', stdout=StringIO())
+
+    @patch('geolocation.models.fetch_coordinates_bulk')
+    def test_resolved_task_is_deleted(self, fetch_coordinates_bulk):
+        fetch_coordinates_bulk.return_value = {self.address: ('37.62', '55.75')}
+
+        self.run_command()
+
+        self.assertFalse(GeocodeTask.objects.exists())
+        self.assertEqual(
+            Location.objects.get(address=self.address).get_lonlat(),
+            (37.62, 55.75)
+        )
+
+    @patch('geolocation.models.fetch_coordinates_bulk')
+    def test_failed_refresh_of_expired_location_keeps_task(self, fetch_coordinates_bulk):
+        fetch_coordinates_bulk.return_value = {}
+        Location.objects.create(
+            address=self.address,
+            longitude=37.62,
+            latitude=55.75,
+            received_at=timezone.now() - coordinates_cache.get_ttl() - timedelta(days=1)
+        )
+
+        self.run_command()
+
+        task = GeocodeTask.objects.get(address=self.address)
+        self.assertEqual(task.attempts, 1)
+        self.assertIsNone(task.claimed_until)
+
+    def test_dead_task_is_purged_and_enqueued_again(self):
+        GeocodeTask.objects.filter(address=self.address).update(
+            attempts=5,
+            created_at=timezone.now() - GeocodeTask.DEAD_TASK_TTL - timedelta(hours=1)
+        )
+
+        self.run_command()
+        GeocodeTask.enqueue([self.address])
+
+        self.assertEqual(GeocodeTask.objects.get(address=self.address).attempts, 0)
+
+    def test_claimed_task_is_skipped(self):
+        GeocodeTask.claim(batch_size=10, max_attempts=5)
+
+        self.assertEqual(GeocodeTask.claim(batch_size=10, max_attempts=5), [])
+
+
+class CoordinatesCacheTest(TestCase):
+    address = 'Москва, Красная площадь, 1'
+
+    def setUp(self):
+        cache.clear()
+        coordinates_cache._entries.clear()
+        self.location = Location.objects.create(
+            address=self.address,
+            longitude=37.62,
+            latitude=55.75,
+            received_at=timezone.now()
+        )
+
+    def get_coordinates(self):
+        return Location.get_coordinates(
+            self.address,
+            geocode_missing=False,
+            enqueue_missing=False
+        )
+
+    def test_edited_location_replaces_cached_coordinates(self):
+        self.assertEqual(self.get_coordinates(), (37.62, 55.75))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.location.longitude = 37.63
+            self.location.save()
+
+        self.assertEqual(self.get_coordinates(), (37.63, 55.75))
+
+    def test_process_cache_rereads_shared_cache(self):
+        self.assertEqual(self.get_coordinates(), (37.62, 55.75))
+        # Так координаты исправляет другой процесс: сбрасывается только
+        # общий кэш, а запись в памяти этого процесса остаётся.
+        Location.objects.filter(pk=self.location.pk).update(longitude=37.63)
+        cache.clear()
+
+        self.assertEqual(self.get_coordinates(), (37.62, 55.75))
+        with patch.object(CoordinatesCache, 'LRU_MAX_AGE', 0):
+            self.assertEqual(self.get_coordinates(), (37.63, 55.75))
+
+
+class PlanRoutesTest(SimpleTestCase):
+    depot = (37.60, 55.75)
+
+    def test_improve_route_uncrosses_segments(self):
+        points = [(0, 0), (1, 0), (2, 1), (2, 0), (3, 1)]
+        matrix = [
+            [((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5 for x2, y2 in points]
+            for x1, y1 in points
+        ]
+
+        route = improve_route(matrix, [1, 2, 3, 4])
+
+        self.assertEqual(route, [1, 3, 2, 4])
+        self.assertAlmostEqual(route_length(matrix, route), 4)
+
+    def test_splits_route_into_batches_in_visiting_order(self):
+        points = [(37.64, 55.75), (37.61, 55.75), (37.63, 55.75), (37.62, 55.75)]
+
+        routes = plan_routes(self.depot, points, batch_size=2)
+
+        self.assertEqual([route.stops for route in routes], [[1, 3], [2, 0]])
+        for route in routes:
+            self.assertGreater(route.distance, 0)
+
+    def test_no_points_give_no_routes(self):
+        self.assertEqual(plan_routes(self.depot, [], batch_size=2), [])
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from foodcartapp.models import OrderEvent
+
+from .views import is_manager
+
+# Сколько событий отдавать за один опрос таблицы событий.
+EVENTS_BATCH_SIZE = 100
+
+# Раз во столько опросов без событий клиенту уходит пустой комментарий,
+# чтобы прокси не закрывали соединение по таймауту.
+HEARTBEAT_EVERY = 10
+
+
+def get_scope_user(scope):
+    """Возвращает пользователя по сессионной куке из ASGI scope."""
+    cookies = SimpleCookie()
+    for name, value in scope['headers']:
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+
+    session_cookie = cookies.get(settings.SESSION_COOKIE_NAME)
+    engine = import_module(settings.SESSION_ENGINE)
+    request = SimpleNamespace(
+        session=engine.SessionStore(session_cookie and session_cookie.value)
+    )
+
+    close_old_connections()
+    return get_user(request)
+
+
+def get_last_event_id(scope):
+    """Возвращает id последнего полученного клиентом события."""
+    headers = dict(scope['headers'])
+    query = dict(
+        part.split('=', 1)
+        for part in scope['query_string'].decode('latin-1').split('&')
+        if '=' in part
+    )
+    value = headers.get(b'last-event-id', b'').decode() or query.get('last_event_id')
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_events(last_event_id):
+    close_old_connections()
+
+    if last_event_id is None:
+        last_event = OrderEvent.objects.order_by('-id').first()
+        return [], last_event.id if last_event else 0
+
+    events = list(
+        OrderEvent.objects
+        .filter(id__gt=last_event_id)
+        .order_by('id')[:EVENTS_BATCH_SIZE]
+    )
+    return events, events[-1].id if events else last_event_id
+
+
+def format_event(event):
+    data = json.dumps(event.payload, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'id: {event.id}\nevent: {event.kind}\ndata: {data}\n\n'.encode()
+
+
+async def order_events_application(scope, receive, send):
+    """ASGI-приложение, транслирующее изменения заказов через SSE.
+
+    Вместо перезагрузки страницы заказов менеджер держит одно
+    соединение, по которому приходят только новые события из
+    OrderEvent, начиная с заголовка Last-Event-ID.
+    """
+    user = await sync_to_async(get_scope_user)(scope)
+    if not is_manager(user):
+        await send({'type': 'http.response.start', 'status': 403, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    last_event_id = get_last_event_id(scope)
+    idle_polls = 0
+
+    try:
+        while not disconnected.is_set():
+            events, last_event_id = await sync_to_async(fetch_events)(last_event_id)
+
+            if events:
+                body = b''.join(format_event(event) for event in events)
+                idle_polls = 0
+            else:
+                idle_polls += 1
+                body = b': ping\n\n' if idle_polls % HEARTBEAT_EVERY == 0 else b''
+
+            if body:
+                await send({
+                    'type': 'http.response.body',
+                    'body': body,
+                    'more_body': True,
+                })
+
+            if len(events) == EVENTS_BATCH_SIZE:
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    disconnected.wait(),
+                    timeout=settings.ORDER_EVENTS_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        watcher.cancel()
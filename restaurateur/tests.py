@@ -1,3 +1,143 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from foodcartapp.models import (Order, OrderElement, Product, ProductCategory,
+                                Restaurant, RestaurantMenuItem)
+from geolocation.cache import coordinates_cache
+from geolocation.models import Location
+
+
+@override_settings(MANAGER_NEAREST_RESTAURANTS=2, RESTAURANT_SEARCH_RADIUS_KM=30)
+class ViewOrdersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        coordinates_cache._entries.clear()
+
+        manager = User.objects.create_user('manager', password='secret', is_staff=True)
+        self.client.force_login(manager)
+
+        self.product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+
+    def create_location(self, address, longitude, latitude):
+        Location.objects.create(
+            address=address,
+            longitude=longitude,
+            latitude=latitude,
+            received_at=timezone.now()
+        )
+
+    def create_restaurant(self, name, longitude, latitude):
+        address = f'Москва, {name}'
+        self.create_location(address, longitude, latitude)
+        restaurant = Restaurant.objects.create(name=name, address=address)
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=self.product)
+        return restaurant
+
+    def test_lists_nearest_restaurants_within_radius(self):
+        # Изменения ресторанов доходят до индекса после коммита.
+        with self.captureOnCommitCallbacks(execute=True):
+            near = self.create_restaurant('Рядом', 37.62, 55.76)
+            middle = self.create_restaurant('Неподалёку', 37.70, 55.76)
+            self.create_restaurant('Чуть дальше', 37.80, 55.76)
+            self.create_restaurant('За городом', 38.60, 55.76)
+
+        self.create_location('Москва, Красная площадь', 37.62, 55.75)
+        order = Order.objects.create(
+            address='Москва, Красная площадь',
+            firstname='Иван',
+            lastname='Иванов',
+            phonenumber='+79991234567'
+        )
+        OrderElement.objects.create(order=order, product=self.product, quantity=1, price=100)
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+
+        [order_item] = response.context['order_items']
+        self.assertEqual(
+            [restaurant for restaurant, _ in order_item['serving_restaurants']],
+            [near, middle]
+        )
+
+    def create_order(self):
+        self.create_location('Москва, Красная площадь', 37.62, 55.75)
+        order = Order.objects.create(
+            address='Москва, Красная площадь',
+            firstname='Иван',
+            lastname='Иванов',
+            phonenumber='+79991234567'
+        )
+        OrderElement.objects.create(order=order, product=self.product, quantity=1, price=100)
+        return order
+
+    def get_serving_restaurants(self):
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        [order_item] = response.context['order_items']
+        return order_item['serving_restaurants']
+
+    def test_lists_restaurants_without_coordinates_last(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            near = self.create_restaurant('Рядом', 37.62, 55.76)
+            not_geocoded = Restaurant.objects.create(name='Без координат', address='Москва, новый адрес')
+            RestaurantMenuItem.objects.create(restaurant=not_geocoded, product=self.product)
+        self.create_order()
+
+        self.assertEqual(
+            [(restaurant, distance is None) for restaurant, distance in self.get_serving_restaurants()],
+            [(near, False), (not_geocoded, True)]
+        )
+
+    @override_settings(RESTAURANT_OPEN_ORDERS_LIMIT=1)
+    def test_free_restaurant_beyond_nearest_full_ones_is_listed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            near = self.create_restaurant('Рядом', 37.62, 55.76)
+            middle = self.create_restaurant('Неподалёку', 37.70, 55.76)
+            free = self.create_restaurant('Чуть дальше', 37.80, 55.76)
+        Restaurant.objects.filter(pk__in=[near.pk, middle.pk]).update(open_orders_count=1)
+        self.create_order()
+
+        self.assertEqual(
+            [restaurant for restaurant, _ in self.get_serving_restaurants()],
+            [free, near]
+        )
+
+
+class ExportOrdersTest(TestCase):
+    def setUp(self):
+        manager = User.objects.create_user('manager', password='secret', is_staff=True)
+        self.async_client.force_login(manager)
+
+        product = Product.objects.create(
+            name='Бургер',
+            category=ProductCategory.objects.create(name='Бургеры'),
+            price=100
+        )
+        self.order = Order.objects.create(
+            address='Москва, Красная площадь',
+            firstname='Иван',
+            lastname='Иванов',
+            phonenumber='+79991234567'
+        )
+        OrderElement.objects.create(order=self.order, product=product, quantity=2, price=100)
+
+    async def test_export_is_readable_under_asgi(self):
+        response = await self.async_client.get(
+            f"{reverse('restaurateur:export_orders')}?format=ndjson"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        [line] = b''.join(response.streaming_content).decode().splitlines()
+        order = json.loads(line)
+        self.assertEqual(order['id'], self.order.id)
+        self.assertEqual(
+            [(element['product_name'], element['quantity']) for element in order['elements']],
+            [('Бургер', 2)]
+        )
@@ -13,6 +13,10 @@ urlpatterns = [
     path('restaurants/', views.view_restaurants, name="RestaurantView"),
 
     path('orders/', views.view_orders, name="view_orders"),
+    path('orders/events/', views.view_order_events, name="order_events"),
+    path('orders/export/', views.export_orders_view, name="export_orders"),
+    path('routes/', views.view_routes, name="view_routes"),
+    path('routes/json/', views.view_routes_json, name="routes_json"),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
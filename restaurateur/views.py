@@ -1,12 +1,26 @@
+from datetime import datetime
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import user_passes_test
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (FileResponse, HttpResponse, HttpResponseBadRequest,
+                         JsonResponse, StreamingHttpResponse)
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.views import View
-from foodcartapp.models import Order, Product, Restaurant
-from geolocation.geocode_api import calculate_distance
+from foodcartapp.delivery import get_delivery_routes
+from foodcartapp.export import (EXPORT_FORMATS, export_orders,
+                                spool_orders_export)
+from foodcartapp.models import Order, OrderEvent, Product, Restaurant
+from foodcartapp.restaurant_index import restaurant_index
+from geolocation.models import Location
+from star_burger.metrics import query_budget
+
+REFINED_DISTANCES_COUNT = 3
 
 
 class Login(forms.Form):
@@ -94,43 +108,150 @@ def view_restaurants(request):
     })
 
 
+def encode_orders_cursor(order):
+    """Кодирует позицию заказа в списке менеджера для ссылки."""
+    cursor = f'{order.status}|{order.created_at.isoformat()}|{order.id}'
+    return urlsafe_base64_encode(cursor.encode())
+
+
+def decode_orders_cursor(value):
+    """Раскодирует курсор из ссылки, для некорректного возвращает None."""
+    try:
+        status, created_at, order_id = (
+            urlsafe_base64_decode(value).decode().split('|')
+        )
+        return int(status), datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        return None
+
+
+def get_orders_page_size(request):
+    try:
+        page_size = int(request.GET['page_size'])
+    except (KeyError, ValueError):
+        return settings.MANAGER_ORDERS_PAGE_SIZE
+
+    return min(max(page_size, 1), settings.MANAGER_ORDERS_MAX_PAGE_SIZE)
+
+
+def get_nearest_restaurants(order, order_coords):
+    """Возвращает ближайшие рестораны заказа в виде [(ресторан, км), ...].
+
+    Из ресторанов, которые могут приготовить заказ, по пространственному
+    индексу выбираются MANAGER_NEAREST_RESTAURANTS ближайших в радиусе
+    RESTAURANT_SEARCH_RADIUS_KM. Если адрес заказа ещё не геокодирован,
+    возвращаются все подходящие рестораны без расстояний, а ресторан,
+    которому заказ уже передан, возвращается при любом расстоянии.
+    Подходящие рестораны без координат добавляются в конец без расстояний:
+    индекс их не видит, но менеджер может передать заказ и им.
+    """
+    restaurants = {
+        restaurant.id: restaurant for restaurant in order.serving_restaurants
+    }
+    if not order_coords or order.serving_restaurant_id:
+        serving_restaurants = []
+        for restaurant in restaurants.values():
+            distance = Location.get_distance(order_coords, restaurant.get_lonlat())
+            serving_restaurants.append((
+                restaurant,
+                None if distance is None else round(distance, 2)
+            ))
+        return serving_restaurants
+
+    # Сначала ищутся рестораны со свободными местами, а рестораны,
+    # у которых набран лимит заказов в сборке, только дополняют список,
+    # иначе они заслоняли бы более далёкие свободные.
+    free_restaurant_ids = {
+        restaurant.id
+        for restaurant in restaurants.values()
+        if restaurant.open_orders_count < settings.RESTAURANT_OPEN_ORDERS_LIMIT
+    }
+    nearest = []
+    for restaurant_ids in (free_restaurant_ids, restaurants.keys() - free_restaurant_ids):
+        if len(nearest) == settings.MANAGER_NEAREST_RESTAURANTS:
+            break
+        nearest += restaurant_index.nearest(
+            order_coords,
+            k=settings.MANAGER_NEAREST_RESTAURANTS - len(nearest),
+            radius_km=settings.RESTAURANT_SEARCH_RADIUS_KM,
+            restaurant_ids=restaurant_ids
+        )
+
+    serving_restaurants = []
+    for position, (restaurant_id, distance) in enumerate(nearest):
+        restaurant = restaurants[restaurant_id]
+        if position < REFINED_DISTANCES_COUNT:
+            distance = Location.get_distance(order_coords, restaurant.get_lonlat())
+        serving_restaurants.append((restaurant, round(distance, 2)))
+
+    serving_restaurants.extend(
+        (restaurant, None)
+        for restaurant in restaurants.values()
+        if restaurant.get_lonlat() is None
+    )
+    return serving_restaurants
+
+
+@query_budget(12)
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    orders = (
-        Order.objects
-        .get_manager_orders()  # type: ignore
-        .get_cost()
-        .get_serving_restaurants()
-    )
+    page_size = get_orders_page_size(request)
+    cursor = decode_orders_cursor(request.GET.get('cursor', ''))
+
+    # Берётся до загрузки заказов, чтобы доска не пропустила изменения,
+    # случившиеся между запросами.
+    last_event = OrderEvent.objects.order_by('-id').first()
+
+    manager_orders = Order.objects.get_manager_orders()  # type: ignore
+    if cursor:
+        manager_orders = manager_orders.after(cursor)
+
+    orders = manager_orders[:page_size].get_serving_restaurants()
+
+    next_cursor = None
+    if len(orders) == page_size:
+        last_order = orders[page_size - 1]
+        last_order_cursor = (last_order.status, last_order.created_at, last_order.id)
+
+        if manager_orders.after(last_order_cursor).exists():
+            next_cursor = encode_orders_cursor(last_order)
 
     order_items = []
 
+    coordinates = Location.get_coordinates_bulk(
+        [order.address for order in orders],
+        geocode_missing=False
+    )
+
     for order in orders:
         url = reverse_lazy('admin:foodcartapp_order_change', args=(order.id,))
 
-        restaurants = order.serving_restaurants
+        serving_restaurants = get_nearest_restaurants(
+            order,
+            coordinates[order.address]
+        )
 
-        for restaurant in restaurants:
-            restaurant.distance = calculate_distance(
-                order.address,
-                restaurant.address
+        # Рестораны, у которых уже набран лимит заказов в сборке,
+        # уходят в конец списка, остальные идут по расстоянию.
+        serving_restaurants.sort(
+            key=lambda candidate: (
+                candidate[0].open_orders_count >= settings.RESTAURANT_OPEN_ORDERS_LIMIT,
+                candidate[1] is None,
+                candidate[1] or 0,
             )
-
-        order.serving_restaurants = sorted(
-            restaurants, key=lambda restaurant: restaurant.distance
         )
 
         order_item = {
             'id': order.id,
             'status': order.get_status_display(),
             'method_payment': order.get_method_payment_display(),
-            'cost': order.cost,
+            'cost': order.total_cost,
             'client': f'{order.firstname} {order.lastname}',
             'phonenumber': order.phonenumber,
             'address': order.address,
             'comment': order.comment,
             'order_status': order.status,
-            'serving_restaurants': order.serving_restaurants,
+            'serving_restaurants': serving_restaurants,
             'url': url,
         }
         order_items.append(order_item)
@@ -140,6 +261,97 @@ def view_orders(request):
         template_name='order_items.html',
         context={
             'order_items': order_items,
-            'Order': Order
+            'search_radius_km': settings.RESTAURANT_SEARCH_RADIUS_KM,
+            'Order': Order,
+            'OrderEvent': OrderEvent,
+            'page_size': page_size,
+            'is_first_page': cursor is None,
+            'next_cursor': next_cursor,
+            'last_event_id': last_event.id if last_event else 0,
         }
     )
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_order_events(request):
+    # Поток событий отдаёт ASGI-приложение star_burger.asgi. Под WSGI
+    # долгие соединения не поддерживаются, и ответ 204 говорит
+    # EventSource больше не переподключаться.
+    return HttpResponse(status=204)
+
+
+def get_routes_batch_size(request):
+    try:
+        return max(int(request.GET['batch_size']), 1)
+    except (KeyError, ValueError):
+        return settings.COURIER_BATCH_SIZE
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_routes(request):
+    batch_size = get_routes_batch_size(request)
+
+    return render(request, template_name='routes.html', context={
+        'restaurant_routes': get_delivery_routes(batch_size),
+        'batch_size': batch_size,
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_routes_json(request):
+    def dump_order(order):
+        return {
+            'id': order.id,
+            'address': order.address,
+            'client': f'{order.firstname} {order.lastname}',
+            'phonenumber': str(order.phonenumber),
+        }
+
+    return JsonResponse({
+        'restaurants': [
+            {
+                'id': routes.restaurant.id,
+                'name': routes.restaurant.name,
+                'batches': [
+                    {
+                        'distance': batch.distance,
+                        'orders': [dump_order(order) for order in batch.orders],
+                    }
+                    for batch in routes.batches
+                ],
+                'unrouted_orders': [
+                    dump_order(order) for order in routes.unrouted_orders
+                ],
+            }
+            for routes in get_delivery_routes(get_routes_batch_size(request))
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def export_orders_view(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Формат выгрузки должен быть csv или ndjson.')
+
+    include_archive = bool(request.GET.get('archive'))
+    filename = f'orders.{export_format}'
+
+    if isinstance(request, ASGIRequest):
+        # ASGIHandler перебирает потоковый ответ в цикле событий,
+        # и генератор с запросами к базе упал бы там с
+        # SynchronousOnlyOperation. Поэтому выгрузка готовится здесь,
+        # а клиенту отдаётся уже готовый файл.
+        return FileResponse(
+            spool_orders_export(export_format, include_archive),
+            as_attachment=True,
+            filename=filename,
+            content_type=EXPORT_FORMATS[export_format]
+        )
+
+    response = StreamingHttpResponse(
+        export_orders(export_format, include_archive=include_archive),
+        content_type=EXPORT_FORMATS[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
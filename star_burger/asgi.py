@@ -0,0 +1,29 @@
+"""
+ASGI config for Django project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Besides the regular Django application it serves the manager's live order
+board as Server-Sent Events, which needs a long-lived async connection.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+from django.urls import reverse
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "star_burger.settings")
+django_application = get_asgi_application()
+
+from restaurateur.events import order_events_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and \
+            scope['path'] == reverse('restaurateur:order_events'):
+        await order_events_application(scope, receive, send)
+        return
+
+    await django_application(scope, receive, send)
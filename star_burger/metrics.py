@@ -0,0 +1,301 @@
+"""Замеры запросов: время ответа, время и число SQL-запросов, обращения к геокодеру.
+
+MetricsMiddleware пишет замеры в заголовок Server-Timing и копит их в
+памяти процесса. Раз в несколько секунд процесс сохраняет свои замеры
+в общий кэш, и metrics_view отдаёт Prometheus сумму по всем воркерам.
+Вьюхи, помеченные query_budget, предупреждают в лог, если сделали
+больше SQL-запросов, чем им положено.
+"""
+import hmac
+import logging
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from geolocation.signals import geocoder_requested
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0
+        self.geocoder_calls = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started_at
+            self.query_count += 1
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.wall_time = 0
+        self.db_time = 0
+        self.queries = 0
+        self.geocoder_calls = 0
+        self.budget_exceeded = 0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def add(self, wall_time, metrics, budget_exceeded):
+        self.requests += 1
+        self.wall_time += wall_time
+        self.db_time += metrics.db_time
+        self.queries += metrics.query_count
+        self.geocoder_calls += metrics.geocoder_calls
+        self.budget_exceeded += budget_exceeded
+
+        bucket = bisect_left(LATENCY_BUCKETS, wall_time)
+        if bucket < len(LATENCY_BUCKETS):
+            self.latency_buckets[bucket] += 1
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.wall_time += other.wall_time
+        self.db_time += other.db_time
+        self.queries += other.queries
+        self.geocoder_calls += other.geocoder_calls
+        self.budget_exceeded += other.budget_exceeded
+        self.latency_buckets = [
+            count + other_count
+            for count, other_count in zip(self.latency_buckets, other.latency_buckets)
+        ]
+
+
+class MetricsRegistry:
+    """Замеры процесса с периодической выгрузкой в общий кэш.
+
+    Каждый воркер занимает в кэше свободный номер и хранит под ним снимок
+    своих замеров с начала работы. Номер и снимок остановленного воркера
+    живут в кэше ещё SNAPSHOT_TIMEOUT, после чего его замеры пропадают
+    из суммы, и Prometheus видит это как сброс счётчиков. Освободившийся
+    номер достаётся следующему запущенному воркеру, поэтому номеров
+    не больше, чем воркеров, запущенных за SNAPSHOT_TIMEOUT.
+    """
+    WORKERS_CACHE_KEY = 'star_burger:metrics:workers'
+    LEASE_CACHE_KEY = 'star_burger:metrics:worker:{}:lease'
+    SNAPSHOT_CACHE_KEY = 'star_burger:metrics:worker:{}'
+    SNAPSHOT_TIMEOUT = 24 * 60 * 60
+    FLUSH_INTERVAL = 5
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = Lock()
+        self._worker = None
+        self._token = uuid.uuid4().hex
+        self._flushed_at = None
+
+    def record(self, view_name, wall_time, metrics, budget_exceeded):
+        with self._lock:
+            stats = self._stats.setdefault(view_name, ViewStats())
+            stats.add(wall_time, metrics, budget_exceeded)
+
+            flush_due = (
+                self._flushed_at is None or
+                time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL
+            )
+
+        if flush_due:
+            self.flush()
+
+    def flush(self):
+        """Сохраняет замеры процесса в общий кэш."""
+        with self._lock:
+            snapshot = {
+                view: {**vars(stats), 'latency_buckets': list(stats.latency_buckets)}
+                for view, stats in self._stats.items()
+            }
+            self._flushed_at = time.monotonic()
+
+        # Номер мог истечь или пропасть из кэша, тогда он берётся заново.
+        if self._worker is None or \
+                cache.get(self.LEASE_CACHE_KEY.format(self._worker)) != self._token:
+            self._worker = self._claim_worker()
+
+        cache.set_many(
+            {
+                self.LEASE_CACHE_KEY.format(self._worker): self._token,
+                self.SNAPSHOT_CACHE_KEY.format(self._worker): snapshot,
+            },
+            timeout=self.SNAPSHOT_TIMEOUT
+        )
+
+    def _claim_worker(self):
+        """Занимает первый свободный номер воркера, а если их нет — новый."""
+        cache.add(self.WORKERS_CACHE_KEY, 0, timeout=None)
+        workers_count = cache.get(self.WORKERS_CACHE_KEY, 0)
+
+        for worker in range(1, workers_count + 1):
+            if cache.add(self.LEASE_CACHE_KEY.format(worker), self._token,
+                         timeout=self.SNAPSHOT_TIMEOUT):
+                return worker
+
+        worker = cache.incr(self.WORKERS_CACHE_KEY)
+        cache.set(self.LEASE_CACHE_KEY.format(worker), self._token,
+                  timeout=self.SNAPSHOT_TIMEOUT)
+        return worker
+
+    def collect(self):
+        """Возвращает замеры, просуммированные по всем воркерам."""
+        self.flush()
+
+        workers_count = cache.get(self.WORKERS_CACHE_KEY, 0)
+        snapshots = cache.get_many([
+            self.SNAPSHOT_CACHE_KEY.format(worker)
+            for worker in range(1, workers_count + 1)
+        ])
+
+        stats = {}
+        for snapshot in snapshots.values():
+            for view, fields in snapshot.items():
+                view_stats = ViewStats()
+                vars(view_stats).update(fields)
+                stats.setdefault(view, ViewStats()).merge(view_stats)
+        return stats
+
+    def render(self):
+        """Возвращает замеры в текстовом формате Prometheus."""
+        stats = sorted(self.collect().items())
+
+        lines = [
+            '# HELP star_burger_request_duration_seconds Время ответа вьюхи.',
+            '# TYPE star_burger_request_duration_seconds histogram',
+        ]
+        for view, view_stats in stats:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, view_stats.latency_buckets):
+                cumulative += count
+                lines.append(
+                    f'star_burger_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="{bound}"}} {cumulative}'
+                )
+            lines += [
+                f'star_burger_request_duration_seconds_bucket'
+                f'{{view="{view}",le="+Inf"}} {view_stats.requests}',
+                f'star_burger_request_duration_seconds_sum'
+                f'{{view="{view}"}} {view_stats.wall_time}',
+                f'star_burger_request_duration_seconds_count'
+                f'{{view="{view}"}} {view_stats.requests}',
+            ]
+
+        counters = [
+            ('db_duration_seconds_total', 'Время SQL-запросов.', 'db_time'),
+            ('db_queries_total', 'Число SQL-запросов.', 'queries'),
+            ('geocoder_requests_total', 'Число обращений к геокодеру.', 'geocoder_calls'),
+            ('query_budget_exceeded_total', 'Сколько раз превышен бюджет запросов.', 'budget_exceeded'),
+        ]
+        for name, description, attribute in counters:
+            lines += [
+                f'# HELP star_burger_{name} {description}',
+                f'# TYPE star_burger_{name} counter',
+            ]
+            lines += [
+                f'star_burger_{name}{{view="{view}"}} {getattr(view_stats, attribute)}'
+                for view, view_stats in stats
+            ]
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def query_budget(max_queries):
+    """Задаёт вьюхе предельное число SQL-запросов на один ответ."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def count_geocoder_requests(sender, addresses_count, **kwargs):
+    if metrics := current_metrics.get():
+        metrics.geocoder_calls += addresses_count
+
+
+geocoder_requested.connect(count_geocoder_requests)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started_at = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        wall_time = time.perf_counter() - started_at
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.view_name if resolver_match else 'unresolved'
+
+        budget = getattr(request, 'query_budget', None)
+        budget_exceeded = budget is not None and metrics.query_count > budget
+        if budget_exceeded:
+            logger.warning(
+                'Вьюха %s сделала %d SQL-запросов при бюджете %d: %s',
+                view_name, metrics.query_count, budget, request.path
+            )
+
+        registry.record(view_name, wall_time, metrics, budget_exceeded)
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={wall_time * 1000:.1f}',
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries"',
+            f'geocoder;desc="{metrics.geocoder_calls} requests"',
+        ])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+
+def has_metrics_access(request):
+    """Пускает к замерам сотрудников и запросы с токеном METRICS_TOKEN.
+
+    Адрес клиента не проверяется: за nginx все запросы приходят
+    с 127.0.0.1.
+    """
+    if request.user.is_staff:
+        return True
+
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(settings.METRICS_TOKEN) and hmac.compare_digest(
+        authorization.encode(),
+        f'Bearer {settings.METRICS_TOKEN}'.encode()
+    )
+
+
+def metrics_view(request):
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
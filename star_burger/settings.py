@@ -18,6 +18,27 @@ DEBUG = env.bool('DEBUG', True)
 ROLLBAR_ENVIRONMENT = env.str('ROLLBAR_ENVIRONMENT', 'development')
 
 YANDEX_API_KEY = env.str('YANDEX_API_KEY', '')
+GEOCODER_BACKEND = env.str(
+    'GEOCODER_BACKEND', 'geolocation.geocode_api.YandexGeocoder')
+GEOCODER_CONCURRENCY = env.int('GEOCODER_CONCURRENCY', 8)
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 5)
+GEOCODER_RETRIES = env.int('GEOCODER_RETRIES', 3)
+GEOCODER_BACKOFF_FACTOR = env.float('GEOCODER_BACKOFF_FACTOR', 0.3)
+GEOCODE_CACHE_TTL = env.int('GEOCODE_CACHE_TTL', 30 * 24 * 60 * 60)
+GEOCODE_LRU_SIZE = env.int('GEOCODE_LRU_SIZE', 4096)
+
+MANAGER_ORDERS_PAGE_SIZE = env.int('MANAGER_ORDERS_PAGE_SIZE', 50)
+MANAGER_ORDERS_MAX_PAGE_SIZE = env.int('MANAGER_ORDERS_MAX_PAGE_SIZE', 500)
+ORDER_EVENTS_POLL_INTERVAL = env.float('ORDER_EVENTS_POLL_INTERVAL', 2)
+ORDER_IDEMPOTENCY_TTL = env.int('ORDER_IDEMPOTENCY_TTL', 24 * 60 * 60)
+ORDER_INTAKE_ASYNC = env.bool('ORDER_INTAKE_ASYNC', False)
+ORDER_ARCHIVE_DAYS = env.int('ORDER_ARCHIVE_DAYS', 30)
+RESTAURANT_OPEN_ORDERS_LIMIT = env.int('RESTAURANT_OPEN_ORDERS_LIMIT', 20)
+RESTAURANT_SEARCH_RADIUS_KM = env.float('RESTAURANT_SEARCH_RADIUS_KM', 30)
+MANAGER_NEAREST_RESTAURANTS = env.int('MANAGER_NEAREST_RESTAURANTS', 5)
+RESTAURANT_INDEX_MAX_AGE = env.int('RESTAURANT_INDEX_MAX_AGE', 60)
+PAYLOAD_VERSION_TTL = env.int('PAYLOAD_VERSION_TTL', 60)
+COURIER_BATCH_SIZE = env.int('COURIER_BATCH_SIZE', 5)
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 
@@ -37,6 +58,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'star_burger.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +113,8 @@ MEDIA_URL = '/media/'
 DATABASES = {'default': env.dj_db_url(
     'DATABASE_URL', 'sqlite:////{0}'.format(os.path.join(BASE_DIR, 'db.sqlite3')))}
 
+CACHES = {'default': env.dj_cache_url('CACHE_URL', 'locmem://')}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -122,6 +146,8 @@ INTERNAL_IPS = [
     '127.0.0.1'
 ]
 
+METRICS_TOKEN = env.str('METRICS_TOKEN', '')
+
 
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "assets"),
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from star_burger.metrics import MetricsRegistry, RequestMetrics, metrics_view
+
+
+class MetricsRegistryTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_collects_metrics_of_all_workers(self):
+        workers = [MetricsRegistry(), MetricsRegistry()]
+        for queries_count, worker in enumerate(workers, start=1):
+            metrics = RequestMetrics()
+            metrics.query_count = queries_count
+            worker.record('view_orders', 0.02, metrics, budget_exceeded=False)
+
+        stats = workers[0].collect()['view_orders']
+
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.queries, 3)
+        self.assertIn(
+            'star_burger_db_queries_total{view="view_orders"} 3',
+            workers[1].render()
+        )
+
+    def test_reuses_expired_worker_slots(self):
+        first_worker = MetricsRegistry()
+        first_worker.flush()
+        # Так истекает номер остановленного воркера.
+        cache.delete_many([
+            MetricsRegistry.LEASE_CACHE_KEY.format(1),
+            MetricsRegistry.SNAPSHOT_CACHE_KEY.format(1),
+        ])
+
+        second_worker = MetricsRegistry()
+        second_worker.flush()
+
+        self.assertEqual(second_worker._worker, 1)
+        self.assertEqual(cache.get(MetricsRegistry.WORKERS_CACHE_KEY), 1)
+
+        first_worker.flush()
+
+        self.assertEqual(first_worker._worker, 2)
+        self.assertEqual(second_worker._worker, 1)
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsViewTest(SimpleTestCase):
+    def get_metrics(self, **headers):
+        request = RequestFactory().get('/metrics', REMOTE_ADDR='127.0.0.1', **headers)
+        request.user = AnonymousUser()
+        return metrics_view(request)
+
+    def test_proxied_request_without_token_is_forbidden(self):
+        self.assertEqual(self.get_metrics().status_code, 403)
+        self.assertEqual(
+            self.get_metrics(HTTP_AUTHORIZATION='Bearer wrong').status_code,
+            403
+        )
+
+    def test_request_with_token_gets_metrics(self):
+        response = self.get_metrics(HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response.status_code, 200)